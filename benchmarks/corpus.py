@@ -0,0 +1,230 @@
+"""
+Корпус бенчмарка: записанные ленты и страницы из fixtures/ и их масштабирование до N записей.
+
+Фикстуры — по одному ответу на источник: RSS РБК, «Коммерсанта» (windows-1251) и «Ведомостей»,
+Atom ТАСС, статьи и листинги ТАСС/«Ведомостей»/РБК/«Коммерсанта» с той разметкой, которую ждут
+site_parsers и LINK_RULES. Масштабированные документы рендерятся из тех же блоков <item>/<entry>
+и той же HTML-разметки, меняются только заголовок, ссылка, дата и текст.
+
+Заголовок записи — заголовок из фикстур с новыми числами и частью слов, заменённых словами
+из их словаря; текст — три фразы из того же словаря с «именами» и числами. Случайные пересечения текстов
+малы, поэтому кластеры образуют в основном явные перепечатки (тот же текст другого издания,
+доля dup_rate) — как в живом окне, а не как при размножении одного шаблона. Всё детерминировано по seed.
+"""
+from __future__ import annotations
+import html
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# лента: файл, имя источника, тег записи, кодировка
+FEEDS = {
+    "rbc": ("rbc_rss.xml", "РБК", "item", "utf-8"),
+    "kommersant": ("kommersant_rss.xml", "Коммерсантъ", "item", "windows-1251"),
+    "vedomosti": ("vedomosti_rss.xml", "Ведомости", "item", "utf-8"),
+    "tass": ("tass_atom.xml", "ТАСС", "entry", "utf-8"),
+}
+# статья: файл, канонический URL (по хосту parse_html выбирает парсер), источник
+ARTICLES = {
+    "tass": ("tass_article.html", "https://tass.ru/ekonomika/25311001", "ТАСС"),
+    "vedomosti": ("vedomosti_article.html",
+                  "https://www.vedomosti.ru/finance/news/2025/10/22/1148002-polyus-dividendi", "Ведомости"),
+    "rbc": ("rbc_article.html", "https://www.rbc.ru/economics/24/10/2025/671a0c4e9a79477d1f2b3c02", "РБК"),
+    "kommersant": ("kommersant_article.html", "https://www.kommersant.ru/doc/8080102", "Коммерсантъ"),
+}
+# листинг: файл, URL страницы (хост выбирает правила LINK_RULES), сколько ссылок в нём размечено
+LISTINGS = {
+    "tass": ("tass_listing.html", "https://tass.ru/ekonomika", 6),
+    "vedomosti": ("vedomosti_listing.html", "https://www.vedomosti.ru/finance", 5),
+    "rbc": ("rbc_listing.html", "https://www.rbc.ru/short_news", 5),
+    "kommersant": ("kommersant_listing.html", "https://www.kommersant.ru/rubric/3", 5),
+}
+_URL_TEMPLATES = {
+    "rbc": "https://www.rbc.ru/finances/{d:%d/%m/%Y}/bench{i:08d}",
+    "kommersant": "https://www.kommersant.ru/doc/9{i:07d}",
+    "vedomosti": "https://www.vedomosti.ru/finance/news/{d:%Y/%m/%d}/{i}-bench",
+    "tass": "https://tass.ru/ekonomika/3{i:07d}",
+}
+
+_SENT_RE = re.compile(r"(?<=[.!?»])\s+(?=[А-ЯЁA-Z«])")
+_WORD_RE = re.compile(r"[а-яё]{4,}", re.IGNORECASE)
+_NUM_RE = re.compile(r"\d+(?:,\d+)?")
+_TAG_RE = re.compile(r"<[^>]+>")
+# слоги для имён собственных: словарь фикстур мал (сотни основ), и случайные тексты только из него
+# пересекались бы сильнее живых, раздувая LSH-кандидатов кластеризации
+_SYLLABLES = tuple("ба бе ви во га гу да до жа за зи ка ко кру ла ли ма ме ми на но ни па пе ро ра "
+                   "са се сти та те то фа фи ха хо ца че ша шу эн юр як ар ос ил ум ев ор ан".split())
+
+
+def read_fixture(name: str, encoding: str = "utf-8") -> str:
+    return (FIXTURES / name).read_bytes().decode(encoding)
+
+
+def _block_re(tag: str) -> re.Pattern:
+    return re.compile(rf"<{tag}>.*?</{tag}>\s*", re.S)
+
+
+@lru_cache(maxsize=None)
+def feed_parts(name: str) -> Tuple[str, List[str], str]:
+    """(шапка, блоки записей, хвост) записанной ленты."""
+    fname, _, tag, enc = FEEDS[name]
+    text = read_fixture(fname, enc)
+    blocks = [m.group(0) for m in _block_re(tag).finditer(text)]
+    head = text[:text.index(blocks[0])]
+    tail = text[text.index(blocks[-1]) + len(blocks[-1]):]
+    return head, blocks, tail
+
+
+def _plain(s: str) -> str:
+    s = html.unescape(s.replace("<![CDATA[", "").replace("]]>", ""))
+    return " ".join(html.unescape(_TAG_RE.sub(" ", s)).split())
+
+
+@lru_cache(maxsize=None)
+def _pools() -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]:
+    """Заголовки, фразы и словарь всех фикстур — материал для текстов масштабированных записей."""
+    titles, sentences, words = [], [], set()
+    for name in FEEDS:
+        _, blocks, _ = feed_parts(name)
+        for b in blocks:
+            title = _plain(re.search(r"<title>(.*?)</title>", b, re.S).group(1))
+            body = _plain((re.search(r"<(description|summary)[^>]*>(.*?)</\1>", b, re.S) or [""] * 3)[2])
+            titles.append(title)
+            sentences.extend(s for s in _SENT_RE.split(body) if len(s) > 20)
+    for fname, _, _ in ARTICLES.values():
+        text = _plain(read_fixture(fname))
+        words.update(w.lower() for w in _WORD_RE.findall(text))
+    for s in titles + sentences:
+        words.update(w.lower() for w in _WORD_RE.findall(s))
+    return tuple(titles), tuple(sentences), tuple(sorted(words))
+
+
+def _renumber(s: str, rng: random.Random) -> str:
+    def repl(m: re.Match) -> str:
+        whole = str(rng.randint(1, 999))
+        return f"{whole},{rng.randint(0, 9)}" if "," in m.group(0) else whole
+    return _NUM_RE.sub(repl, s)
+
+
+@dataclass
+class Corpus:
+    """Генератор записей поверх фикстур; now — «текущее» время, записи разложены по span_hours до него."""
+
+    now: datetime
+    seed: int = 0
+    dup_rate: float = 0.1
+    span_hours: float = 24.0
+    salt_words: int = 6
+
+    def items(self, n: int) -> List[Dict[str, Any]]:
+        """n сырых записей в формате парсеров (source/title/link/published/summary), по убыванию времени."""
+        rng = random.Random(self.seed)
+        titles, _, words = _pools()
+        names = list(FEEDS)
+        out: List[Dict[str, Any]] = []
+        for i in range(n):
+            name = names[i % len(names)]
+            when = self.now - timedelta(seconds=self.span_hours * 3600.0 * i / max(n, 1))
+            if out and rng.random() < self.dup_rate:
+                # перепечатка: тот же текст другого издания
+                orig = out[rng.randrange(len(out))]
+                title, summary = orig["title"], orig["summary"]
+            else:
+                title = " ".join(w if rng.random() < 0.5 else rng.choice(words)
+                                 for w in _renumber(rng.choice(titles), rng).split())
+                summary = " ".join(self._phrase(rng, words) for _ in range(3))
+            out.append({
+                "source": FEEDS[name][1],
+                "title": title,
+                "link": _URL_TEMPLATES[name].format(i=i, d=when),
+                "published": when.astimezone(timezone.utc).isoformat(),
+                "summary": summary,
+                "_feed": name,
+            })
+        return out
+
+    def _phrase(self, rng: random.Random, words: Tuple[str, ...]) -> str:
+        """Фраза из salt_words слов словаря фикстур, трёх «имён» и числа."""
+        parts = rng.sample(words, self.salt_words)
+        for _ in range(3):
+            name = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(3, 4)))
+            parts.insert(rng.randrange(len(parts) + 1), name.capitalize())
+        parts.insert(rng.randrange(len(parts) + 1), str(rng.randint(10, 99999)))
+        return " ".join(parts).capitalize() + "."
+
+    def feeds(self, n: int, per_feed: int = 100) -> List[Tuple[str, bytes, str]]:
+        """Записи n, разложенные в документы лент по per_feed: (имя, тело в кодировке фикстуры, источник)."""
+        items = self.items(n)
+        by_feed: Dict[str, List[Dict[str, Any]]] = {}
+        for it in items:
+            by_feed.setdefault(it["_feed"], []).append(it)
+        docs = []
+        for name, its in by_feed.items():
+            for lo in range(0, len(its), per_feed):
+                docs.append((name, render_feed(name, its[lo:lo + per_feed]), FEEDS[name][1]))
+        return docs
+
+    def pages(self, n: int) -> Iterator[Tuple[str, str, str]]:
+        """n страниц статей (url, html, источник) по кругу из четырёх записанных разметок."""
+        rng = random.Random(self.seed)
+        titles, _, _ = _pools()
+        names = list(ARTICLES)
+        for i in range(n):
+            name = names[i % len(names)]
+            yield render_article(name, _renumber(rng.choice(titles), rng), i)
+
+
+def render_feed(name: str, items: List[Dict[str, Any]]) -> bytes:
+    """Документ ленты name с записями items: блоки записанной ленты с подставленными полями."""
+    head, blocks, tail = feed_parts(name)
+    enc = FEEDS[name][3]
+    atom = FEEDS[name][2] == "entry"
+    out = [head]
+    for j, it in enumerate(items):
+        b = blocks[j % len(blocks)]
+        dt = datetime.fromisoformat(it["published"])
+        title, link = html.escape(it["title"], quote=False), html.escape(it["link"])
+        b = re.sub(r"<title>.*?</title>", lambda _: f"<title>{title}</title>", b, flags=re.S)
+        if atom:
+            stamp = dt.isoformat()
+            b = re.sub(r'<link href="[^"]*"/>', lambda _: f'<link href="{link}"/>', b)
+            b = re.sub(r"<id>.*?</id>", lambda _: f"<id>{link}</id>", b)
+            b = re.sub(r"<(published|updated)>.*?</\1>", lambda m: f"<{m.group(1)}>{stamp}</{m.group(1)}>", b)
+            summary = html.escape(f"<p>{html.escape(it['summary'])}</p>")
+            b = re.sub(r"<summary([^>]*)>.*?</summary>", lambda m: f"<summary{m.group(1)}>{summary}</summary>", b,
+                       flags=re.S)
+        else:
+            b = re.sub(r"<link>.*?</link>", lambda _: f"<link>{link}</link>", b)
+            b = re.sub(r"<guid>.*?</guid>", lambda _: f"<guid>{link}</guid>", b)
+            b = re.sub(r"<pubDate>.*?</pubDate>", lambda _: f"<pubDate>{format_datetime(dt)}</pubDate>", b)
+            b = re.sub(r"<description>.*?</description>",
+                       lambda _: f"<description><![CDATA[<p>{it['summary']}</p>]]></description>", b, flags=re.S)
+        out.append(b)
+    out.append(tail)
+    return "".join(out).encode(enc, errors="xmlcharrefreplace")
+
+
+def render_article(name: str, title: str, i: int) -> Tuple[str, str, str]:
+    """Страница статьи name под номером i с заголовком title: (url, html, источник)."""
+    fname, url, source = ARTICLES[name]
+    page = read_fixture(fname)
+    h1 = re.search(r"<h1[^>]*>(.*?)</h1>", page, re.S)
+    page = page[:h1.start(1)] + html.escape(title, quote=False) + page[h1.end(1):]
+    return f"{url}?n={i}", page, source
+
+
+def listing(name: str) -> Tuple[str, str, int]:
+    """(url, html, ожидаемое число ссылок) записанного листинга."""
+    fname, url, expected = LISTINGS[name]
+    return url, read_fixture(fname), expected
+
+
+def default_now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
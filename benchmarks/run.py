@@ -0,0 +1,408 @@
+"""
+Офлайн-бенчмарк пайплайна и API по записанным фикстурам (benchmarks/fixtures).
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --out bench.json
+    python -m benchmarks.run --sizes 1000,10000 --compare bench.json --tolerance 0.15
+
+Стадии, для каждого размера корпуса N записей:
+    fetch          — http_client.fetch лент N/per_feed документов у локального двойника (stand_in)
+    parse_atom     — разбор документов лент RSS/Atom
+    parse_html     — site_parsers.parse_html страниц статей (не больше --html-max страниц)
+    listing_links  — extract_listing_links по листингам с правилами LINK_RULES
+    dedup          — dedup по N записям с 10% повторов
+    to_llm_schema  — _to_llm_schema с кластеризацией
+    score          — _score_static по записям окна
+    feature_matrix — сборка FeatureMatrix
+    top_k_query    — запросы FeatureMatrix.query (с фильтрами и без)
+    get_top_k      — get_top_k(items=...) целиком, без LLM
+
+Результат — JSON: meta (версия Python, платформа, ревизия), config и по строке на (стадия, N)
+с лучшим и медианным временем прогона, пропускной способностью в единицах стадии в секунду
+и перцентилями задержки единицы (запрос, документ, страница, query). --compare сравнивает
+пропускную способность с прежним JSON и возвращает 1, если какая-то стадия медленнее
+больше чем на --tolerance.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# до импорта модулей радара: бенчмарк не трогает кэш, архив и экспорт и не ходит в LLM
+_CACHE_DIR = tempfile.mkdtemp(prefix="radar-bench-")
+atexit.register(shutil.rmtree, _CACHE_DIR, True)
+os.environ["RADAR_CACHE_DIR"] = _CACHE_DIR
+os.environ["RADAR_EXPORT_DIR"] = ""
+os.environ["RADAR_RAW_ARCHIVE"] = ""
+os.environ.pop("OPENROUTER_API_KEY", None)
+os.environ.pop("RADAR_LLM_URL", None)
+
+from radar_parser.app.dedup.cluster import ClusterIndex
+from radar_parser.app.dedup.dedup import dedup
+from radar_parser.app.fetch import http_client
+from radar_parser.app.fetch.rate_limiter import LIMITER
+from radar_parser.app.parsers.atom_parser import parse_atom
+from radar_parser.app.parsers.listing_fetch import extract_listing_links
+from radar_parser.app.parsers.site_parsers import parse_html
+from services.api.src.api import service
+from services.radar_parser.llm_async_adapter import _to_llm_schema
+from .corpus import FEEDS, LISTINGS, Corpus, default_now, listing
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROOT = Path(__file__).resolve().parent.parent
+STAGES = ("fetch", "parse_atom", "parse_html", "listing_links", "dedup", "to_llm_schema",
+          "score", "feature_matrix", "top_k_query", "get_top_k")
+
+
+@dataclass
+class Run:
+    seconds: float
+    units: int
+    latencies: List[float] = field(default_factory=list)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max в миллисекундах (ближайший ранг)."""
+    v = sorted(values)
+
+    def at(q: float) -> float:
+        return v[min(len(v) - 1, max(0, int(round(q * len(v))) - 1))] * 1000.0
+
+    return {"p50": round(at(0.50), 4), "p95": round(at(0.95), 4), "p99": round(at(0.99), 4),
+            "max": round(v[-1] * 1000.0, 4)}
+
+
+class Bench:
+    """Данные корпуса по размерам (готовятся вне замеров и переиспользуются стадиями)."""
+
+    def __init__(self, seed: int = 0, per_feed: int = 100, html_max: int = 10_000, queries: int = 200):
+        self.now = default_now()
+        self.corpus = Corpus(self.now, seed=seed)
+        self.seed = seed
+        self.per_feed = per_feed
+        self.html_max = html_max
+        self.queries = queries
+        self.base_url: Optional[str] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._cache: Dict[Tuple[str, int], Any] = {}
+
+    def _cached(self, key: str, n: int, build: Callable[[], Any]) -> Any:
+        if (key, n) not in self._cache:
+            self._cache[(key, n)] = build()
+        return self._cache[(key, n)]
+
+    def items(self, n: int) -> List[Dict[str, Any]]:
+        return self._cached("items", n, lambda: self.corpus.items(n))
+
+    def records(self, n: int) -> List[Dict[str, Any]]:
+        return self._cached("records", n, lambda: _to_llm_schema(self.items(n), ClusterIndex(),
+                                                                 self.now.timestamp()))
+
+    def events(self, n: int):
+        return self._cached("events", n, lambda: service._ingest(self.records(n), self.now))
+
+    def forget(self, n: int) -> None:
+        self._cache = {key: v for key, v in self._cache.items() if key[1] != n}
+
+    # --- локальный двойник источников ---
+
+    def start_stand_in(self) -> str:
+        if self.base_url:
+            return self.base_url
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stand_in", "--port", str(port), "--per-feed", str(self.per_feed),
+             "--seed", str(self.seed)], cwd=str(ROOT), env=os.environ.copy())
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"stand-in exited with code {self._proc.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("stand-in did not start in 60s")
+        # бенчмарк меряет HTTP-слой, а не вежливость к источникам
+        LIMITER.configure("127.0.0.1", 1e9, 1e9)
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    def close(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            self._proc.wait(10)
+
+
+# --- стадии: один прогон, подготовка данных — вне замера ---
+
+def stage_fetch(b: Bench, n: int) -> Run:
+    base = b.start_stand_in()
+    names = list(FEEDS)
+    docs = max(1, -(-n // b.per_feed))
+    urls = [f"{base}/feed/{names[i % len(names)]}/{i // len(names)}" for i in range(docs)]
+
+    async def go():
+        try:
+            t0 = time.perf_counter()
+            res = await asyncio.gather(*(http_client.fetch(u, kind="rss") for u in urls))
+            return time.perf_counter() - t0, res
+        finally:
+            await http_client.close_session()
+
+    seconds, res = asyncio.run(go())
+    return Run(seconds, n, [r.elapsed for r in res],
+               {"requests": len(res), "bytes": sum(len(r.body) for r in res)})
+
+
+def stage_parse_atom(b: Bench, n: int) -> Run:
+    docs = b._cached("feeds", n, lambda: b.corpus.feeds(n, b.per_feed))
+    lat, parsed = [], 0
+    t0 = time.perf_counter()
+    for _, body, source in docs:
+        t = time.perf_counter()
+        parsed += len(parse_atom(body, source))
+        lat.append(time.perf_counter() - t)
+    seconds = time.perf_counter() - t0
+    if parsed != n:
+        raise AssertionError(f"parse_atom: {parsed} items from {n}-item corpus")
+    return Run(seconds, parsed, lat, {"documents": len(docs)})
+
+
+def stage_parse_html(b: Bench, n: int) -> Run:
+    m = min(n, b.html_max)
+    pages = b._cached("pages", m, lambda: list(b.corpus.pages(m)))
+    lat = []
+    t0 = time.perf_counter()
+    for url, page, source in pages:
+        t = time.perf_counter()
+        parse_html(url, page, source)
+        lat.append(time.perf_counter() - t)
+    return Run(time.perf_counter() - t0, m, lat)
+
+
+def stage_listing_links(b: Bench, n: int) -> Run:
+    m = min(n, b.html_max)
+    names = list(LISTINGS)
+    pages = [listing(names[i % len(names)]) for i in range(m)]
+    lat, links = [], 0
+    t0 = time.perf_counter()
+    for url, page, expected in pages:
+        t = time.perf_counter()
+        got = len(extract_listing_links(url, page))
+        lat.append(time.perf_counter() - t)
+        if got != expected:
+            raise AssertionError(f"extract_listing_links({url}): {got} links, fixture has {expected}")
+        links += got
+    return Run(time.perf_counter() - t0, m, lat, {"links": links})
+
+
+def stage_dedup(b: Bench, n: int) -> Run:
+    def build():
+        items = list(b.items(n))
+        # каждая десятая запись — копия соседней, как одна новость в двух лентах
+        for i in range(9, n, 10):
+            items[i] = dict(items[i - 1])
+        return items
+
+    items = b._cached("dedup", n, build)
+    t0 = time.perf_counter()
+    out = dedup(items)
+    return Run(time.perf_counter() - t0, n, extra={"kept": len(out)})
+
+
+def stage_to_llm_schema(b: Bench, n: int) -> Run:
+    items = b.items(n)
+    index = ClusterIndex()
+    t0 = time.perf_counter()
+    out = _to_llm_schema(items, index, b.now.timestamp())
+    seconds = time.perf_counter() - t0
+    b._cache[("records", n)] = out
+    return Run(seconds, n, extra={"records": len(out), "clusters": len({r["dedup_group"] for r in out})})
+
+
+def stage_score(b: Bench, n: int) -> Run:
+    records = b.records(n)
+    t0 = time.perf_counter()
+    events = service._ingest(records, b.now)
+    seconds = time.perf_counter() - t0
+    b._cache[("events", n)] = events
+    return Run(seconds, len(records), extra={"events": len(events)})
+
+
+def stage_feature_matrix(b: Bench, n: int) -> Run:
+    events = b.events(n)
+    t0 = time.perf_counter()
+    service._feature_matrix(events)
+    return Run(time.perf_counter() - t0, len(events))
+
+
+def stage_top_k_query(b: Bench, n: int) -> Run:
+    events = b.events(n)
+    matrix = b._cached("matrix", n, lambda: service._feature_matrix(events))
+    sources = sorted(matrix.by_source)
+    tickers = sorted(matrix.by_ticker, key=lambda t: -len(matrix.by_ticker[t]))[:8]
+    # смесь запросов /radar: окно, страница, порог, источник, тикер
+    shapes = [dict(hours=24), dict(hours=6), dict(hours=24, offset=20), dict(hours=24, min_hotness=0.3)]
+    shapes += [dict(hours=24, source=s) for s in sources[:2]] + [dict(hours=24, ticker=t) for t in tickers[:2]]
+    lat = []
+    t0 = time.perf_counter()
+    for q in range(b.queries):
+        t = time.perf_counter()
+        matrix.query(b.now, 10, **shapes[q % len(shapes)])
+        lat.append(time.perf_counter() - t)
+    return Run(time.perf_counter() - t0, b.queries, lat, {"index_events": len(matrix)})
+
+
+def stage_get_top_k(b: Bench, n: int) -> Run:
+    records = b.records(n)
+    t0 = time.perf_counter()
+    res = asyncio.run(service.get_top_k(window=24, k=10, items=records))
+    return Run(time.perf_counter() - t0, len(records), extra={"total": res["total"]})
+
+
+STAGE_FNS: Dict[str, Callable[[Bench, int], Run]] = {name: globals()[f"stage_{name}"] for name in STAGES}
+UNITS = {"parse_html": "page", "listing_links": "page", "top_k_query": "query"}
+
+
+def measure(b: Bench, stage: str, n: int, repeat: int, budget: float) -> Dict[str, Any]:
+    """Повторяет стадию до repeat раз (после первого — пока укладывается в budget секунд)."""
+    runs: List[Run] = []
+    spent = 0.0
+    while len(runs) < repeat and (not runs or spent < budget):
+        run = STAGE_FNS[stage](b, n)
+        runs.append(run)
+        spent += run.seconds
+    best = min(runs, key=lambda r: r.seconds)
+    row: Dict[str, Any] = {
+        "stage": stage, "n": n, "unit": UNITS.get(stage, "item"), "units": best.units, "runs": len(runs),
+        "best_s": round(best.seconds, 6),
+        "median_s": round(statistics.median(r.seconds for r in runs), 6),
+        "throughput": round(best.units / best.seconds, 2) if best.seconds > 0 else None,
+    }
+    lat = [x for r in runs for x in r.latencies]
+    if lat:
+        row["latency_ms"] = _percentiles(lat)
+    row.update(best.extra)
+    return row
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), capture_output=True,
+                             text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def meta() -> Dict[str, Any]:
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": getattr(np, "__version__", None),
+        "git_rev": _git_rev(),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Строки (стадия, N) обоих прогонов с отношением пропускной способности и p95 задержки к базе."""
+    base = {(r["stage"], r["n"]): r for r in baseline.get("results", [])}
+    out = []
+    for r in current.get("results", []):
+        b = base.get((r["stage"], r["n"]))
+        if not b or not b.get("throughput") or not r.get("throughput"):
+            continue
+        ratio = r["throughput"] / b["throughput"]
+        row = {"stage": r["stage"], "n": r["n"], "baseline": b["throughput"], "current": r["throughput"],
+               "ratio": round(ratio, 3), "regression": ratio < 1.0 - tolerance}
+        if "latency_ms" in r and "latency_ms" in b and b["latency_ms"]["p95"] > 0:
+            row["p95_ratio"] = round(r["latency_ms"]["p95"] / b["latency_ms"]["p95"], 3)
+        out.append(row)
+    return out
+
+
+def _cli(argv=None) -> int:
+    p = argparse.ArgumentParser(description="RADAR offline pipeline/API benchmark over recorded fixtures")
+    p.add_argument("--sizes", default="1000,10000,100000", help="размеры корпуса через запятую")
+    p.add_argument("--stages", default=",".join(STAGES), help="стадии через запятую")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--budget", type=float, default=20.0, help="повторять точку, пока суммарно меньше, сек")
+    p.add_argument("--per-feed", type=int, default=100, help="записей в документе ленты")
+    p.add_argument("--html-max", type=int, default=10_000, help="предел страниц для parse_html/listing_links")
+    p.add_argument("--queries", type=int, default=200, help="запросов на точку top_k_query")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="-")
+    p.add_argument("--compare", help="JSON прежнего прогона для сравнения")
+    p.add_argument("--tolerance", type=float, default=0.15, help="допустимое падение пропускной способности")
+    args = p.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGE_FNS]
+    if unknown:
+        p.error(f"unknown stages: {', '.join(unknown)}")
+    b = Bench(seed=args.seed, per_feed=args.per_feed, html_max=args.html_max, queries=args.queries)
+    report: Dict[str, Any] = {
+        "meta": meta(),
+        "config": {"sizes": sizes, "stages": stages, "repeat": args.repeat, "budget": args.budget,
+                   "per_feed": args.per_feed, "html_max": args.html_max, "queries": args.queries,
+                   "seed": args.seed},
+        "results": [],
+    }
+    try:
+        for n in sizes:
+            for stage in stages:
+                row = measure(b, stage, n, args.repeat, args.budget)
+                report["results"].append(row)
+                lat = row.get("latency_ms")
+                print(f"{stage:>15} n={n:<7} {row['throughput']:>12.1f} {row['unit']}/s  best={row['best_s']:.4f}s"
+                      + (f"  p50={lat['p50']:.3f}ms p95={lat['p95']:.3f}ms" if lat else ""), file=sys.stderr)
+            b.forget(n)
+    finally:
+        b.close()
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        for row in report["comparison"]:
+            mark = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['stage']:>15} n={row['n']:<7} x{row['ratio']:.3f}  {mark}", file=sys.stderr)
+        status = 1 if any(row["regression"] for row in report["comparison"]) else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        Path(args.out).write_text(text, encoding="utf-8")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
@@ -0,0 +1,92 @@
+"""
+Локальный HTTP-двойник источников для стадии fetch: отдаёт ленты и статьи корпуса без сети.
+
+    python -m benchmarks.stand_in --port 8790 --per-feed 100
+
+GET /feed/<имя>/<страница> — документ ленты (RSS/Atom из fixtures/) с per_feed записями,
+GET /article/<имя>/<номер> — страница статьи, GET /listing/<имя> — записанный листинг.
+Ответы с ETag и Content-Type как у живых источников; If-None-Match даёт 304.
+Тела рендерятся один раз и держатся в памяти (pages различных документов на ленту),
+поэтому время ответа — это HTTP-слой, а не генерация.
+"""
+import argparse
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from aiohttp import web
+
+from .corpus import ARTICLES, FEEDS, LISTINGS, Corpus, listing, render_article, render_feed
+
+
+class StandIn:
+    def __init__(self, per_feed: int = 100, pages: int = 16, seed: int = 0):
+        corpus = Corpus(datetime.now(timezone.utc), seed=seed)
+        items = corpus.items(per_feed * pages * len(FEEDS))
+        self.feeds: Dict[Tuple[str, int], bytes] = {}
+        for name in FEEDS:
+            its = [it for it in items if it["_feed"] == name]
+            for p in range(pages):
+                self.feeds[(name, p)] = render_feed(name, its[p * per_feed:(p + 1) * per_feed])
+        self.pages = pages
+        self.stats = {"requests": 0, "not_modified": 0, "bytes": 0}
+
+    def _respond(self, request: web.Request, body: bytes, content_type: str, charset: str) -> web.Response:
+        self.stats["requests"] += 1
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if request.headers.get("If-None-Match") == etag:
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        self.stats["bytes"] += len(body)
+        return web.Response(body=body, headers={"ETag": etag, "Cache-Control": "max-age=60",
+                                                "Content-Type": f"{content_type}; charset={charset}"})
+
+    async def feed(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in FEEDS:
+            raise web.HTTPNotFound()
+        body = self.feeds[(name, int(request.match_info["page"]) % self.pages)]
+        ctype = "application/atom+xml" if FEEDS[name][2] == "entry" else "application/rss+xml"
+        return self._respond(request, body, ctype, FEEDS[name][3])
+
+    async def article(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in ARTICLES:
+            raise web.HTTPNotFound()
+        _, page, _ = render_article(name, f"Новость {request.match_info['i']}", int(request.match_info["i"]))
+        return self._respond(request, page.encode("utf-8"), "text/html", "utf-8")
+
+    async def listing(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in LISTINGS:
+            raise web.HTTPNotFound()
+        return self._respond(request, listing(name)[1].encode("utf-8"), "text/html", "utf-8")
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/feed/{name}/{page:\\d+}", self.feed)
+        app.router.add_get("/article/{name}/{i:\\d+}", self.article)
+        app.router.add_get("/listing/{name}", self.listing)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+def _cli(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Offline stand-in for RADAR news sources")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.getenv("RADAR_BENCH_STAND_IN_PORT", "8790")))
+    ap.add_argument("--per-feed", type=int, default=100, help="записей в документе ленты")
+    ap.add_argument("--pages", type=int, default=16, help="различных документов на ленту")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    stand_in = StandIn(per_feed=args.per_feed, pages=args.pages, seed=args.seed)
+    web.run_app(stand_in.app(), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
@@ -1,17 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, Query, HTTPException
-from .service import get_top_k
+from radar_parser.app.export.columnar import flush_all, init_export
+from services.radar_parser.llm_async_adapter import default_cluster_index, default_item_store
+from services.radar_parser.pipeline import close_session, shutdown_parse_pool
+from .service import get_top_k, warm_window, COLLECTOR, LLM_CACHE, LLM_CLIENT
 
-app = FastAPI(title="RADAR")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    LLM_CLIENT.start()
+    init_export()
+    warm_window()
+    COLLECTOR.start()
+    yield
+    await COLLECTOR.stop()
+    await close_session()
+    shutdown_parse_pool()
+    await LLM_CLIENT.close()
+    LLM_CACHE.close()
+    default_cluster_index().close()
+    default_item_store().close()
+    await asyncio.get_running_loop().run_in_executor(None, flush_all)
+
+
+app = FastAPI(title="RADAR", lifespan=lifespan)
 
 @app.get("/radar")
-async def radar(window: int = Query(24, gt=0), k: int = Query(5, gt=0)):
+async def radar(window: int = Query(24, gt=0), k: int = Query(5, gt=0), offset: int = Query(0, ge=0),
+                min_hotness: float = Query(0.0, ge=0.0, le=1.0), source: Optional[str] = None,
+                ticker: Optional[str] = None):
     if window <= 0 or k <= 0:
         raise HTTPException(status_code=400, detail="window and k must be positive")
-    return await get_top_k(window=window, k=k)
+    return await get_top_k(window=window, k=k, offset=offset, min_hotness=min_hotness,
+                           source=source, ticker=ticker)
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "llm_cache": LLM_CACHE.stats()}
 
 if __name__ == "__main__":
     import uvicorn
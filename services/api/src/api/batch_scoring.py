@@ -0,0 +1,200 @@
+import bisect
+import copy
+import heapq
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .window import ScoredEvent
+
+try:
+    import numpy as np
+except ImportError:  # без numpy работает тот же расчёт в чистом Python
+    np = None
+
+STATIC_FEATURES = ("financial", "confirmations", "source_rep", "entities")
+
+
+def _source_key(ev: ScoredEvent) -> str:
+    return (ev.payload.get("source") or "").casefold()
+
+
+def _tickers(ev: ScoredEvent) -> List[str]:
+    entities = ev.payload.get("entities")
+    return [t.upper() for t in entities.get("tickers", [])] if isinstance(entities, dict) else []
+
+
+class FeatureMatrix:
+    """
+    Колоночный индекс оценённых событий, упорядоченный по времени (публикации, а без него — приёма).
+
+    Всё, что не зависит от текущего момента, раскладывается по столбцам один раз:
+    взвешенная сумма статических фич, время публикации, число повторов и «якорь» velocity
+    (момент появления самого раннего из последних velocity_last_n членов кластера).
+    Запрос бинарным поиском берёт срез окна, сужает его индексами source/ticker и досчитывает
+    только зависящие от now recency и velocity для этого среза; затем лучший член каждого
+    кластера и argpartition по топу. Формулы совпадают с service._finalize.
+    """
+
+    def __init__(self, events: Sequence[ScoredEvent], weights: Dict[str, float],
+                 half_life_hours: float, velocity_scale: float, velocity_last_n: int):
+        evs = list(events)
+        evs.sort(key=lambda ev: (ev.time if ev.has_time else ev.ingested_at).timestamp())
+        self.events = evs
+        self.weights = weights
+        self.half_life_hours = half_life_hours
+        self.velocity_scale = velocity_scale
+        groups: Dict[str, int] = {}
+        self.group = [groups.setdefault(ev.group, len(groups)) for ev in evs]
+        self.t = [ev.time.timestamp() for ev in evs]
+        self.has_time = [ev.has_time for ev in evs]
+        self.window_t = [(ev.time if ev.has_time else ev.ingested_at).timestamp() for ev in evs]
+        self.repeats = [float(ev.repeats) for ev in evs]
+        self.vel_n, self.vel_anchor, self.has_arrivals = [], [], []
+        for ev in evs:
+            arr = ev.arrivals
+            n = min(len(arr) - 1, velocity_last_n) if len(arr) >= 2 else 0
+            self.vel_n.append(float(n))
+            self.vel_anchor.append(arr[-(n + 1)] if n else 0.0)
+            self.has_arrivals.append(bool(arr))
+        self.static = {f: [float(ev.payload["features"][f]) for ev in evs] for f in STATIC_FEATURES}
+        # инвертированные индексы фильтров: позиции по возрастанию, т.е. тоже упорядочены по времени
+        by_source: Dict[str, List[int]] = {}
+        by_ticker: Dict[str, List[int]] = {}
+        for i, ev in enumerate(evs):
+            by_source.setdefault(_source_key(ev), []).append(i)
+            for t in _tickers(ev):
+                by_ticker.setdefault(t, []).append(i)
+        self.by_source = by_source
+        self.by_ticker = by_ticker
+        if np is not None:
+            self.group = np.asarray(self.group, dtype=np.int64)
+            for name in ("t", "window_t", "repeats", "vel_n", "vel_anchor"):
+                setattr(self, name, np.asarray(getattr(self, name), dtype=np.float64))
+            self.has_time = np.asarray(self.has_time, dtype=bool)
+            self.has_arrivals = np.asarray(self.has_arrivals, dtype=bool)
+            self.by_source = {k: np.asarray(v, dtype=np.int64) for k, v in by_source.items()}
+            self.by_ticker = {k: np.asarray(v, dtype=np.int64) for k, v in by_ticker.items()}
+            self.static = {f: np.asarray(col, dtype=np.float64) for f, col in self.static.items()}
+        self.static_w = self._static_w(weights)
+
+    def _static_w(self, weights: Dict[str, float]):
+        if np is not None:
+            out = np.zeros(len(self.events), dtype=np.float64)
+            for f in STATIC_FEATURES:
+                out += weights.get(f, 0.0) * self.static[f]
+            return out
+        return [sum(weights.get(f, 0.0) * self.static[f][i] for f in STATIC_FEATURES)
+                for i in range(len(self.events))]
+
+    def reweighted(self, weights: Dict[str, float], half_life_hours: float,
+                   velocity_scale: float) -> "FeatureMatrix":
+        """Та же матрица с другими весами и параметрами затухания — без повторного обхода событий."""
+        m = copy.copy(self)
+        m.weights = weights
+        m.half_life_hours = half_life_hours
+        m.velocity_scale = velocity_scale
+        m.static_w = m._static_w(weights)
+        return m
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def hotness(self, now: datetime, idx=None):
+        """hotness событий idx (по умолчанию всех) на момент now."""
+        now_ts = now.timestamp()
+        w_rec = self.weights.get("recency", 0.0)
+        w_vel = self.weights.get("velocity", 0.0)
+        if np is None:
+            idx = range(len(self.events)) if idx is None else idx
+            return [self._hotness_one(i, now_ts, w_rec, w_vel) for i in idx]
+        idx = np.arange(len(self.events)) if idx is None else idx
+        t, repeats, has_time = self.t[idx], self.repeats[idx], self.has_time[idx]
+        age_h = np.maximum(0.0, (now_ts - t) / 3600.0)
+        recency = np.where(has_time, np.exp2(-age_h / self.half_life_hours), 0.0)
+        span_h = np.maximum((now_ts - self.vel_anchor[idx]) / 3600.0, 0.25)
+        vel_arr = np.tanh(self.vel_n[idx] / span_h / self.velocity_scale)
+        fallback_ok = has_time & (repeats > 1) & (age_h > 0)
+        vel_fb = np.where(fallback_ok, np.tanh(repeats / np.maximum(age_h, 1.0) / self.velocity_scale), 0.0)
+        velocity = np.where(self.has_arrivals[idx], vel_arr, vel_fb)
+        return np.clip(self.static_w[idx] + w_rec * recency + w_vel * velocity, 0.0, 1.0)
+
+    def _hotness_one(self, i: int, now_ts: float, w_rec: float, w_vel: float) -> float:
+        age_h = max(0.0, (now_ts - self.t[i]) / 3600.0)
+        recency = 2 ** (-age_h / self.half_life_hours) if self.has_time[i] else 0.0
+        if self.has_arrivals[i]:
+            n = self.vel_n[i]
+            velocity = math.tanh(n / max((now_ts - self.vel_anchor[i]) / 3600.0, 0.25) / self.velocity_scale) \
+                if n else 0.0
+        elif self.has_time[i] and self.repeats[i] > 1 and age_h > 0:
+            velocity = math.tanh(self.repeats[i] / max(age_h, 1.0) / self.velocity_scale)
+        else:
+            velocity = 0.0
+        return max(0.0, min(1.0, self.static_w[i] + w_rec * recency + w_vel * velocity))
+
+    def _candidates(self, lo: int, source: Optional[str], ticker: Optional[str]):
+        """Позиции с индексом ≥ lo, прошедшие фильтры source/ticker (по возрастанию)."""
+        lists = []
+        if source is not None:
+            lists.append(self.by_source.get(source.casefold(), []))
+        if ticker is not None:
+            lists.append(self.by_ticker.get(ticker.upper(), []))
+        if np is None:
+            if not lists:
+                return list(range(lo, len(self.events)))
+            sets = [set(l[bisect.bisect_left(l, lo):]) for l in lists]
+            return sorted(set.intersection(*sets))
+        if not lists:
+            return np.arange(lo, len(self.events))
+        cand = None
+        for l in lists:
+            l = np.asarray(l, dtype=np.int64)
+            l = l[np.searchsorted(l, lo):]
+            cand = l if cand is None else np.intersect1d(cand, l, assume_unique=True)
+        return cand
+
+    def query(self, now: datetime, k: int, hours: Optional[float] = None, offset: int = 0,
+              min_hotness: float = 0.0, source: Optional[str] = None,
+              ticker: Optional[str] = None) -> Tuple[List[ScoredEvent], int]:
+        """
+        Лучший по hotness член каждого кластера в окне hours с учётом фильтров;
+        возвращает страницу [offset, offset + k) по убыванию hotness и общее число кластеров.
+        """
+        if not self.events or k <= 0:
+            return [], 0
+        lo = 0
+        if hours is not None:
+            cutoff = now.timestamp() - hours * 3600.0
+            lo = bisect.bisect_left(self.window_t, cutoff) if np is None \
+                else int(np.searchsorted(self.window_t, cutoff, side="left"))
+        cand = self._candidates(lo, source, ticker)
+        if len(cand) == 0:
+            return [], 0
+        hot = self.hotness(now, cand)
+        need = offset + k
+        if np is None:
+            best: Dict[int, Tuple[float, int]] = {}
+            for i, h in zip(cand, hot):
+                if h < min_hotness:
+                    continue
+                g = self.group[i]
+                if g not in best or h > best[g][0]:
+                    best[g] = (h, i)
+            page = heapq.nlargest(need, best.values())[offset:]
+            return [self.events[i] for _, i in page], len(best)
+        keep = hot >= min_hotness
+        cand, hot = cand[keep], hot[keep]
+        if cand.size == 0:
+            return [], 0
+        # лучший член каждого кластера: сортировка по (группа, -hotness) и первый в каждой группе
+        order = np.lexsort((-hot, self.group[cand]))
+        g = self.group[cand][order]
+        firsts = order[np.concatenate(([True], g[1:] != g[:-1]))]
+        total = int(firsts.size)
+        if firsts.size > need:
+            # порог need-го по величине hotness: равные ему остаются, чтобы ничьи разрешались как в чистом Python
+            h = hot[firsts]
+            firsts = firsts[h >= np.partition(h, firsts.size - need)[firsts.size - need]]
+        # по убыванию hotness, при равенстве — более свежее событие
+        firsts = firsts[np.lexsort((-cand[firsts], -hot[firsts]))][offset:need]
+        return [self.events[i] for i in cand[firsts]], total
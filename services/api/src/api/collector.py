@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+REFRESH_INTERVAL_S = float(os.getenv("RADAR_REFRESH_INTERVAL", "60"))
+COLLECT_HOURS = int(os.getenv("RADAR_COLLECT_HOURS", "48"))
+
+
+class Collector:
+    """
+    Фоновый сборщик: раз в interval секунд обновляет окно событий через refresh_fn(hours).
+
+    Все одновременные вызовы refresh() (фоновый цикл и запросы /radar при холодном старте)
+    ждут одну и ту же задачу, а не запускают параллельный обход источников.
+    """
+
+    def __init__(self, refresh_fn: Callable[[int], Awaitable[None]],
+                 interval: float = REFRESH_INTERVAL_S, hours: int = COLLECT_HOURS):
+        self.refresh_fn = refresh_fn
+        self.interval = interval
+        self.hours = hours
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def is_stale(self) -> bool:
+        """True, если окно ни разу не собиралось или не обновлялось дольше двух интервалов."""
+        if self.last_refresh is None:
+            return True
+        return time.monotonic() - self.last_refresh > 2 * self.interval
+
+    async def _run(self, hours: int) -> None:
+        try:
+            await self.refresh_fn(hours)
+            self.last_refresh = time.monotonic()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self._inflight = None
+
+    async def refresh(self, hours: Optional[int] = None) -> None:
+        """Запускает обновление или присоединяется к уже идущему."""
+        task = self._inflight
+        if task is None:
+            task = self._inflight = asyncio.ensure_future(self._run(max(hours or 0, self.hours)))
+        await asyncio.shield(task)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли фоновый цикл (start())."""
+        return self._loop_task is not None and not self._loop_task.done()
+
+    def start(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        for task in (self._loop_task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._loop_task = None
+        self._inflight = None
@@ -0,0 +1,48 @@
+import re
+from typing import Dict, Iterable, List, Set
+
+from radar_parser.app.text.trie import trie_regex
+
+
+class KeywordMatcher:
+    """
+    Поиск всех терминов нескольких групп за один проход по тексту.
+
+    Все термины компилируются в один regex вида (?=(<trie>)): lookahead не поглощает текст,
+    поэтому совпадения ищутся на каждой позиции и пересекающиеся термины не теряются.
+    Если на позиции совпал длинный термин, засчитываются и термины, являющиеся его префиксами
+    («уголь» → ещё и «угол»). Поиск подстрочный и без учёта регистра — как прежние `k in t`.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups: Dict[str, Set[str]] = {}
+        self.term_groups: Dict[str, Set[str]] = {}
+        for name, terms in groups.items():
+            ts = {t.lower() for t in terms if t}
+            self.groups[name] = ts
+            for t in ts:
+                self.term_groups.setdefault(t, set()).add(name)
+        all_terms = sorted(self.term_groups)
+        self.prefixes: Dict[str, List[str]] = {
+            t: [p for p in all_terms if t.startswith(p)] for t in all_terms
+        }
+        self.regex = re.compile("(?=(" + trie_regex(all_terms) + "))") if all_terms else None
+
+    def terms(self, text: str) -> Set[str]:
+        """Все встретившиеся в тексте термины (любых групп)."""
+        found: Set[str] = set()
+        if self.regex is None or not text:
+            return found
+        for m in self.regex.finditer(text.lower()):
+            hit = m.group(1)
+            if hit and hit not in found:
+                found.update(self.prefixes[hit])
+        return found
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """Совпавшие термины по группам: {"group": {"term", ...}} (пустые группы присутствуют)."""
+        out: Dict[str, Set[str]] = {name: set() for name in self.groups}
+        for t in self.terms(text):
+            for name in self.term_groups[t]:
+                out[name].add(t)
+        return out
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.radar_parser.llm_async_adapter import _fingerprint
+
+CACHE_DIR = os.getenv("RADAR_CACHE_DIR", ".radar_cache")
+LLM_CACHE_TTL_S = float(os.getenv("RADAR_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("RADAR_LLM_CACHE_MAX", "5000"))
+
+
+def make_key(model: str, system_prompt: str, user_input: str) -> str:
+    """Ключ ответа: модель + sha1 системного промпта + отпечаток нормализованного входа."""
+    sp = hashlib.sha1((system_prompt or "").encode("utf-8")).hexdigest()
+    return f"{model}:{sp}:{_fingerprint(user_input or '')}"
+
+
+class LLMCache:
+    """
+    Персистентный кэш ответов LLM в SQLite (RADAR_CACHE_DIR/llm_cache.sqlite).
+
+    Запись живёт ttl секунд с момента создания; при превышении max_entries вытесняются
+    давно не читанные (LRU по last_used). Одинаковые запросы, пришедшие одновременно,
+    ждут один и тот же вызов, а не идут в сеть параллельно.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = LLM_CACHE_TTL_S,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = Path(path or Path(CACHE_DIR) / "llm_cache.sqlite")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_used)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Возвращает ответ из кэша либо вычисляет его; исключения не кэшируются.
+
+        Вычисление — одна общая задача на ключ, каждый вызывающий ждёт её через shield:
+        отмена или таймаут одного из ждущих (в том числе того, кто запустил задачу)
+        не отменяет её для остальных, а досчитанный ответ всё равно попадёт в кэш.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, compute))
+            # исключение забираем, даже если к концу задачи ждущих не осталось
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            if value:
+                self.put(key, value)
+            return value
+        finally:
+            self._pending.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": size,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
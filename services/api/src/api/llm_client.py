@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import random
+import ssl
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+LLM_POOL_LIMIT = int(os.getenv("RADAR_LLM_POOL_LIMIT", "16"))
+LLM_KEEPALIVE_S = float(os.getenv("RADAR_LLM_KEEPALIVE", "60"))
+LLM_RETRIES = int(os.getenv("RADAR_LLM_RETRIES", "3"))
+LLM_BACKOFF_S = float(os.getenv("RADAR_LLM_BACKOFF", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("RADAR_LLM_BACKOFF_MAX", "8"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@lru_cache(maxsize=1)
+def _ssl_context() -> ssl.SSLContext:
+    """Создаёт SSL-контекст с доверенными корневыми сертификатами; учитывает SSL_CERT_FILE/SSL_CERT_DIR и certifi (если установлен)."""
+    ctx = ssl.create_default_context()
+    cafile = os.getenv("SSL_CERT_FILE")
+    capath = os.getenv("SSL_CERT_DIR")
+    if cafile or capath:
+        try:
+            ctx.load_verify_locations(cafile=cafile, capath=capath)
+        except Exception:
+            pass
+    try:
+        import certifi
+        ctx.load_verify_locations(certifi.where())
+    except Exception:
+        pass
+    return ctx
+
+
+def _make_connector() -> aiohttp.TCPConnector:
+    """Создаёт aiohttp-коннектор с пулом keep-alive соединений и проверкой SSL (можно отключить через OPENROUTER_INSECURE_SSL=1)."""
+    ssl_opt = False if os.getenv("OPENROUTER_INSECURE_SSL") == "1" else _ssl_context()
+    return aiohttp.TCPConnector(limit=LLM_POOL_LIMIT, limit_per_host=LLM_POOL_LIMIT,
+                                keepalive_timeout=LLM_KEEPALIVE_S, ssl=ssl_opt)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """Пауза перед повтором: Retry-After сервера, иначе экспоненциальный backoff с full jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_BACKOFF_MAX_S)
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_S * 2 ** attempt))
+
+
+class LLMClient:
+    """
+    Долгоживущий HTTP-клиент для OpenRouter: одна сессия с пулом соединений на всё приложение.
+
+    Открывается на старте API (start) и закрывается на остановке (close); при вызове вне
+    приложения (скрипты, тесты) сессия создаётся лениво. Сессия привязана к event loop
+    и пересоздаётся, если цикл сменился.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(connector=_make_connector())
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        session, self._session, self._loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def post_json(self, url: str, payload: Dict[str, Any], headers: Dict[str, str],
+                        timeout: float = 60) -> Dict[str, Any]:
+        """POST с повторами на 429/5xx и сетевых ошибках; возвращает распарсенный JSON либо подробную ошибку."""
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self.start().post(url, json=payload, headers=headers,
+                                             timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    text = await resp.text()
+                    if resp.status == 200:
+                        try:
+                            return json.loads(text)
+                        except Exception as e:
+                            raise RuntimeError(f"OpenRouter JSON parse error: {e}; payload: {text[:300]}")
+                    error = RuntimeError(f"OpenRouter HTTP {resp.status}: {text[:300]}")
+                    if resp.status not in RETRY_STATUSES:
+                        raise error
+                    retry_after = resp.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = RuntimeError(f"OpenRouter connection error: {e!r}")
+            if attempt >= LLM_RETRIES:
+                raise error
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+            attempt += 1
+
+
+LLM_CLIENT = LLMClient()
@@ -0,0 +1,140 @@
+"""
+Локальная заглушка OpenRouter chat completions для нагрузочных прогонов /radar без сети и токенов.
+
+Запуск:
+    python -m services.api.src.api.llm_stub --port 8089 --latency lognormal:-0.7,0.5 --error-rate 0.02
+    RADAR_LLM_URL=http://127.0.0.1:8089/v1/chat/completions python -m services.api.src.api
+
+Поведение детерминировано: задержка, ошибка и ответ зависят только от seed, тела запроса
+и номера его повтора, поэтому одинаковый прогон даёт одинаковый результат.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Распределение задержки ответа, секунды:
+    fixed:0.5 | uniform:0.2,1.5 | normal:0.8,0.2 | lognormal:mu,sigma | exp:mean.
+    """
+    kind, _, args = (spec or "fixed:0").partition(":")
+    p = [float(x) for x in args.split(",") if x.strip()] if args else []
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rng: p[0] if p else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(p[0], p[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(p[0], p[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(p[0], p[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / p[0])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+def _first_sentence(user_prompt: str) -> str:
+    m = re.search(r"TEXT:\s*(.+)", user_prompt or "")
+    text = (m.group(1) if m else user_prompt or "").strip()
+    return re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0][:160] or "Событие"
+
+
+def default_content(payload: Dict[str, Any]) -> str:
+    """Канонический ответ: драфт из первой фразы текста или JSON-сводка, если просили сводку."""
+    user = next((m.get("content", "") for m in payload.get("messages", []) if m.get("role") == "user"), "")
+    if "impact_level" in user:
+        return json.dumps({
+            "impact_level": "низкое",
+            "summary": "Ответ заглушки: существенного влияния на российский рынок не ожидается.",
+            "watchlist": [],
+            "rationale": "stub",
+        }, ensure_ascii=False)
+    headline = _first_sentence(user)
+    return f"{headline}\n\n- Черновик сгенерирован локальной заглушкой.\n- Факты взяты из исходного текста."
+
+
+class StubLLM:
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0,
+                 error_statuses: Tuple[int, ...] = (429, 503), seed: int = 0,
+                 responses: Optional[Dict[str, str]] = None):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.seed = seed
+        self.responses = responses or {}
+        self.attempts: Dict[str, int] = {}
+        self.stats = {"requests": 0, "errors": 0}
+
+    def _rng(self, body: bytes) -> random.Random:
+        digest = hashlib.sha1(body).hexdigest()
+        attempt = self.attempts.get(digest, 0)
+        self.attempts[digest] = attempt + 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    async def chat(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        payload = json.loads(body or b"{}")
+        rng = self._rng(body)
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency(rng))
+        if rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            status = rng.choice(self.error_statuses)
+            return web.json_response({"error": {"message": "stub error", "code": status}}, status=status)
+        model = payload.get("model", "stub")
+        content = self.responses.get(model) or default_content(payload)
+        return web.json_response({
+            "id": f"stub-{hashlib.sha1(body).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(body) + len(content)) // 4},
+        })
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        app.router.add_post("/api/v1/chat/completions", self.chat)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+def _cli(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Stub OpenRouter chat completions server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.getenv("RADAR_LLM_STUB_PORT", "8089")))
+    ap.add_argument("--latency", default=os.getenv("RADAR_LLM_STUB_LATENCY", "fixed:0"))
+    ap.add_argument("--error-rate", type=float, default=float(os.getenv("RADAR_LLM_STUB_ERROR_RATE", "0")))
+    ap.add_argument("--error-statuses", default=os.getenv("RADAR_LLM_STUB_ERROR_STATUSES", "429,503"))
+    ap.add_argument("--seed", type=int, default=int(os.getenv("RADAR_LLM_STUB_SEED", "0")))
+    ap.add_argument("--responses", default=os.getenv("RADAR_LLM_STUB_RESPONSES"),
+                    help="JSON-файл {model: content} с фиксированными ответами")
+    args = ap.parse_args(argv)
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+    stub = StubLLM(latency=args.latency, error_rate=args.error_rate,
+                   error_statuses=tuple(int(s) for s in args.error_statuses.split(",") if s.strip()),
+                   seed=args.seed, responses=responses)
+    web.run_app(stub.app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
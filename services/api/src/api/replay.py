@@ -0,0 +1,375 @@
+"""
+Реплей и бэктест скоринга по архиву сырых ответов источников.
+
+Манифест — JSONL, по строке на скачанный ответ:
+    {"fetched_at": "2025-10-04T10:05:00Z" | epoch, "source": "РБК", "kind": "rss" | "bridge" | "html",
+     "url": "https://...", "path": "bodies/0001.xml[.gz|.zst]", "status": 200}
+path — относительно файла манифеста; необязательный "headers" ({"content-type": ...}) задаёт
+кодировку HTML-страниц, как Content-Type ответа в живом сборе. Архив сырых ответов (RADAR_RAW_ARCHIVE) пишет ровно такие
+строки в fetches-YYYY-MM-DD.jsonl, поэтому вместо манифеста можно передать каталог архива. Ответы проходят тот же путь, что и в живом сборе
+(parse_atom/parse_html → фильтр по времени и дедуп → _to_llm_schema с кластеризацией → _score_static),
+но часы симулированные: момент приёма — fetched_at. LLM не вызывается.
+
+Каждые tick минут строится топ-k окна для каждой конфигурации сетки (веса, период полураспада
+recency, масштаб velocity) и сравнивается с тем, что произошло дальше: релевантность кластера —
+число новых сообщений о нём за horizon часов после тика (или оценка из файла меток по URL).
+Метрики — NDCG@k, precision@k и MRR, усреднённые по тикам. Дни независимы (каждый прогревается
+окном предыдущих часов), поэтому дни и части сетки считаются параллельно в процессах.
+
+    python -m services.api.src.api.replay manifest.jsonl --grid grid.json --out report.json
+    python -m services.api.src.api.replay /var/radar/raw --grid grid.json
+"""
+from __future__ import annotations
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from radar_parser.app.dedup.cluster import ClusterIndex
+from radar_parser.app.dedup.dedup import Deduper, _canonical_url
+from radar_parser.app.fetch.http_client import decode_body
+from radar_parser.app.fetch.raw_archive import decompress
+from radar_parser.app.filter.time_filter import is_recent
+from radar_parser.app.parsers.atom_parser import parse_atom
+from radar_parser.app.parsers.site_parsers import parse_html
+from services.radar_parser.item_store import entry_key
+from services.radar_parser.llm_async_adapter import _fingerprint, _has_bad_http, _to_llm_schema
+from .batch_scoring import FeatureMatrix
+from .service import RETAIN_HOURS, TIME_DECAY_HALF_LIFE_HOURS, VELOCITY_LAST_N, VELOCITY_SCALE, WEIGHTS, \
+    _score_static
+from .window import EventWindow
+
+FEED_KINDS = {"rss", "bridge", "atom"}
+PAGE_KINDS = {"html"}
+DAY_S = 86400.0
+_CHARSET_RE = re.compile(r"charset\s*=\s*([^;\s]+)", re.I)
+
+
+def _epoch(v: Any) -> Optional[float]:
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        dt = datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def load_manifest(*paths: str) -> List[Dict[str, Any]]:
+    """
+    Строки манифестов (файлов или каталогов архива) с fetched_at в epoch, по времени; base — каталог файла.
+    Пропускаются ответы без тела, не-2xx и виды, которые реплей не разбирает (листинги — их статьи в архиве отдельно).
+    """
+    files: List[Path] = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.glob("fetches-*.jsonl")) if p.is_dir() else [p])
+    out = []
+    for path in files:
+        base = str(path.resolve().parent)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                e = json.loads(line)
+                ts = _epoch(e.get("fetched_at"))
+                kind = (e.get("kind") or "").lower()
+                if ts is None or kind not in FEED_KINDS | PAGE_KINDS or not e.get("path") \
+                        or not 200 <= int(e.get("status") or 200) < 300:
+                    continue
+                e["fetched_at"] = ts
+                e["kind"] = kind
+                e.setdefault("base", base)
+                out.append(e)
+    out.sort(key=lambda e: e["fetched_at"])
+    return out
+
+
+def read_body(entry: Dict[str, Any]) -> bytes:
+    path = Path(entry["base"]) / entry["path"]
+    return decompress(path.read_bytes(), path.suffix)
+
+
+def _charset(content_type: Optional[str]) -> Optional[str]:
+    m = _CHARSET_RE.search(content_type or "")
+    return m.group(1).strip("\"'").lower() if m else None
+
+
+def decode_html(body: bytes, headers: Optional[Dict[str, str]] = None) -> str:
+    """Текст страницы тем же декодером, что в живом сборе (FetchResult.text): charset из записанного Content-Type."""
+    return decode_body(body, _charset({k.lower(): v for k, v in (headers or {}).items()}.get("content-type")))
+
+
+def parse_payload(entry: Dict[str, Any], body: bytes) -> List[Dict[str, Any]]:
+    """Тот же разбор, что в пайплайне: лента → parse_atom, страница статьи → parse_html."""
+    source = entry.get("source") or "unknown"
+    if entry["kind"] in FEED_KINDS:
+        return parse_atom(body, source)
+    item = parse_html(entry.get("url") or "", decode_html(body, entry.get("headers")), source)
+    item.pop("raw_html", None)
+    return [item]
+
+
+def expand_grid(spec: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Декартово произведение сетки {"weights": [{...}, ...], "half_life_hours": [...], "velocity_scale": [...]}.
+    Веса — частичные переопределения WEIGHTS; отсутствующая ось — текущее значение сервиса.
+    """
+    spec = spec or {}
+    weights = spec.get("weights") or [{}]
+    half_lives = spec.get("half_life_hours") or [TIME_DECAY_HALF_LIFE_HOURS]
+    scales = spec.get("velocity_scale") or [VELOCITY_SCALE]
+    return [{"weights": {**WEIGHTS, **w}, "half_life_hours": float(hl), "velocity_scale": float(vs)}
+            for w, hl, vs in itertools.product(weights, half_lives, scales)]
+
+
+def _dcg(gains: Iterable[float]) -> float:
+    return sum((2.0 ** g - 1.0) / math.log2(i + 2) for i, g in enumerate(gains))
+
+
+def ranking_metrics(ranked: List[str], gains: Dict[str, float], k: int,
+                    min_gain: float = 1.0) -> Optional[Tuple[float, float, float]]:
+    """(NDCG@k, precision@k, reciprocal rank) ранжирования; None — на тике нечего было угадывать."""
+    ideal = _dcg(sorted(gains.values(), reverse=True)[:k])
+    if ideal <= 0:
+        return None
+    got = [gains.get(g, 0.0) for g in ranked[:k]]
+    relevant = [g >= min_gain for g in got]
+    rr = next((1.0 / (i + 1) for i, ok in enumerate(relevant) if ok), 0.0)
+    return _dcg(got) / ideal, sum(relevant) / k, rr
+
+
+def _replay_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Один день (плюс прогрев до и горизонт после) для части сетки.
+
+    Возвращает суммы метрик по конфигурациям и счётчики. Одинаковые тела ответов
+    (опрос каждую минуту без новых статей) парсятся один раз и сразу пропускаются.
+    """
+    window_h, k, horizon_s = task["window_hours"], task["k"], task["horizon_hours"] * 3600.0
+    day_start, day_end, tick_s = task["day_start"], task["day_end"], task["tick_minutes"] * 60.0
+    labels: Dict[str, float] = task.get("labels") or {}
+    configs: List[Tuple[int, Dict[str, Any]]] = task["configs"]
+
+    index, window = ClusterIndex(), EventWindow()
+    seen: Set[str] = set()
+    bodies: Set[str] = set()
+    arrivals: Dict[str, List[float]] = {}
+    group_urls: Dict[str, Set[str]] = {}
+    ticks: List[Tuple[float, Set[str], Dict[int, List[str]]]] = []
+    stats = {"payloads": 0, "parsed": 0, "items": 0, "events": 0}
+
+    def ingest(entry: Dict[str, Any]) -> None:
+        t = entry["fetched_at"]
+        stats["payloads"] += 1
+        url = entry.get("url") or ""
+        # у строк архива адрес содержимого уже есть — повторное тело отсекается без чтения с диска
+        if entry.get("sha256") and entry["sha256"] + ":" + url in bodies:
+            return
+        try:
+            body = read_body(entry)
+        except OSError:
+            return
+        digest = (entry.get("sha256") or hashlib.sha1(body).hexdigest()) + ":" + url
+        if digest in bodies:
+            return
+        bodies.add(digest)
+        stats["parsed"] += 1
+        now = datetime.fromtimestamp(t, tz=timezone.utc)
+        cutoff = now - timedelta(hours=window_h)
+        dedup = Deduper()
+        fresh = [it for it in parse_payload(entry, body)
+                 if is_recent(it, cutoff) and dedup.accept(it) and not _has_bad_http(it)
+                 and entry_key(it.get("link")) not in seen]
+        for rec in _to_llm_schema(fresh, index, now=t):
+            key = entry_key(rec.get("ссылка на саму статью"), _fingerprint(rec["текст статьи"]))
+            if key in seen:
+                continue
+            seen.add(key)
+            stats["items"] += 1
+            group = rec["dedup_group"]
+            arrivals.setdefault(group, []).append(t)
+            if rec.get("ссылка на саму статью"):
+                group_urls.setdefault(group, set()).add(_canonical_url(rec["ссылка на саму статью"]))
+            ev = _score_static(rec, now)
+            if ev is not None:
+                window.add(ev)
+                stats["events"] += 1
+
+    def evaluate(t: float) -> None:
+        now = datetime.fromtimestamp(t, tz=timezone.utc)
+        window.evict(now, max(RETAIN_HOURS, window_h))
+        index.evict(t, max(RETAIN_HOURS, window_h))
+        events = window.select(now, window_h)
+        if not events:
+            return
+        base = FeatureMatrix(events, WEIGHTS, TIME_DECAY_HALF_LIFE_HOURS, VELOCITY_SCALE, VELOCITY_LAST_N)
+        tops = {}
+        for ci, cfg in configs:
+            m = base.reweighted(cfg["weights"], cfg["half_life_hours"], cfg["velocity_scale"])
+            top, _ = m.query(now, k, window_h)
+            tops[ci] = [ev.group for ev in top]
+        ticks.append((t, {ev.group for ev in events}, tops))
+
+    next_tick = day_start
+    for entry in task["entries"]:
+        while next_tick <= entry["fetched_at"] and next_tick < day_end:
+            evaluate(next_tick)
+            next_tick += tick_s
+        ingest(entry)
+    while next_tick < day_end:
+        evaluate(next_tick)
+        next_tick += tick_s
+
+    sums = {ci: [0.0, 0.0, 0.0, 0] for ci, _ in configs}
+    scored_ticks = 0
+    for t, candidates, tops in ticks:
+        if labels:
+            gains = {g: max((labels.get(u, 0.0) for u in group_urls.get(g, ())), default=0.0)
+                     for g in candidates}
+        else:
+            gains = {g: float(sum(1 for a in arrivals.get(g, ()) if t < a <= t + horizon_s))
+                     for g in candidates}
+        if not any(gains.values()):
+            continue
+        scored_ticks += 1
+        for ci, ranked in tops.items():
+            res = ranking_metrics(ranked, gains, k, task["min_gain"])
+            if res is None:
+                continue
+            acc = sums[ci]
+            acc[0] += res[0]
+            acc[1] += res[1]
+            acc[2] += res[2]
+            acc[3] += 1
+    return {"sums": sums, "ticks": scored_ticks, **stats}
+
+
+def plan_tasks(entries: List[Dict[str, Any]], configs: List[Dict[str, Any]], workers: int,
+               window_hours: float, horizon_hours: float, warmup_hours: Optional[float] = None,
+               **opts: Any) -> List[Dict[str, Any]]:
+    """Режет манифест на дни (UTC) с прогревом и горизонтом, а сетку — на части, чтобы занять все процессы."""
+    if not entries:
+        return []
+    warmup_s = (window_hours if warmup_hours is None else warmup_hours) * 3600.0
+    first = math.floor(entries[0]["fetched_at"] / DAY_S) * DAY_S
+    last = entries[-1]["fetched_at"]
+    days = [first + i * DAY_S for i in range(int((last - first) // DAY_S) + 1)]
+    chunks = max(1, min(len(configs), workers // max(1, len(days))))
+    indexed = list(enumerate(configs))
+    parts = [indexed[i::chunks] for i in range(chunks)]
+    times = [e["fetched_at"] for e in entries]
+    tasks = []
+    for day in days:
+        lo = bisect.bisect_left(times, day - warmup_s)
+        hi = bisect.bisect_left(times, day + DAY_S + horizon_hours * 3600.0)
+        if lo == hi:
+            continue
+        for part in parts:
+            tasks.append({"entries": entries[lo:hi], "day_start": day, "day_end": day + DAY_S,
+                          "configs": part, "window_hours": window_hours,
+                          "horizon_hours": horizon_hours, **opts})
+    return tasks
+
+
+def run_replay(entries: List[Dict[str, Any]], configs: List[Dict[str, Any]], k: int = 5,
+               window_hours: float = 24.0, tick_minutes: float = 60.0, horizon_hours: float = 6.0,
+               min_gain: float = 1.0, labels: Optional[Dict[str, float]] = None,
+               workers: Optional[int] = None, warmup_hours: Optional[float] = None) -> Dict[str, Any]:
+    """Прогоняет манифест по всем конфигурациям; отчёт — метрики по конфигурациям, лучшие первыми."""
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    tasks = plan_tasks(entries, configs, workers, window_hours, horizon_hours, warmup_hours,
+                       k=k, tick_minutes=tick_minutes, min_gain=min_gain, labels=labels or {})
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_replay_task, tasks))
+    else:
+        results = [_replay_task(t) for t in tasks]
+
+    totals = {ci: [0.0, 0.0, 0.0, 0] for ci in range(len(configs))}
+    for res in results:
+        for ci, acc in res["sums"].items():
+            tot = totals[ci]
+            for i in range(4):
+                tot[i] += acc[i]
+    rows = []
+    for ci, cfg in enumerate(configs):
+        ndcg, prec, rr, n = totals[ci]
+        rows.append({**cfg, "ticks": n,
+                     f"ndcg@{k}": round(ndcg / n, 4) if n else None,
+                     f"precision@{k}": round(prec / n, 4) if n else None,
+                     "mrr": round(rr / n, 4) if n else None})
+    rows.sort(key=lambda r: -(r[f"ndcg@{k}"] or 0.0))
+    # дни, общие для нескольких частей сетки, в счётчиках учитываем один раз
+    per_day = {}
+    for task, res in zip(tasks, results):
+        per_day.setdefault(task["day_start"], res)
+    return {
+        "k": k, "window_hours": window_hours, "tick_minutes": tick_minutes, "horizon_hours": horizon_hours,
+        "target": "labels" if labels else "future_mentions",
+        "days": len(per_day), "tasks": len(tasks), "workers": workers,
+        "payloads": sum(r["payloads"] for r in per_day.values()),
+        "parsed": sum(r["parsed"] for r in per_day.values()),
+        "items": sum(r["items"] for r in per_day.values()),
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "configs": rows,
+    }
+
+
+def load_labels(path: str) -> Dict[str, float]:
+    """JSONL {"url": ..., "gain": ...} — внешняя оценка важности (например, движение цены после новости)."""
+    out: Dict[str, float] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                out[_canonical_url(r["url"])] = float(r.get("gain", 1.0))
+    return out
+
+
+def _cli(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="RADAR replay/backtest over archived raw feeds")
+    p.add_argument("manifest", nargs="+", help="JSONL-манифесты сырых ответов или каталоги архива RADAR_RAW_ARCHIVE")
+    p.add_argument("--grid", help="JSON сетки параметров (weights/half_life_hours/velocity_scale)")
+    p.add_argument("--labels", help="JSONL меток {url, gain}; по умолчанию — будущие упоминания кластера")
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--window", type=float, default=24.0, help="окно топа, часов")
+    p.add_argument("--tick", type=float, default=60.0, help="шаг симулированных часов, минут")
+    p.add_argument("--horizon", type=float, default=6.0, help="горизонт оценки, часов")
+    p.add_argument("--min-gain", type=float, default=1.0, help="порог релевантности для precision/MRR")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--out", default="-")
+    args = p.parse_args(argv)
+
+    grid = None
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as f:
+            grid = json.load(f)
+    report = run_replay(load_manifest(*args.manifest), expand_grid(grid), k=args.k, window_hours=args.window,
+                        tick_minutes=args.tick, horizon_hours=args.horizon, min_gain=args.min_gain,
+                        labels=load_labels(args.labels) if args.labels else None, workers=args.workers)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        best = report["configs"][0] if report["configs"] else {}
+        print(f"days={report['days']} payloads={report['payloads']} items={report['items']} "
+              f"elapsed={report['elapsed_s']}s best ndcg@{args.k}={best.get(f'ndcg@{args.k}')}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
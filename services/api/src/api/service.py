@@ -1,17 +1,27 @@
 import asyncio
-from typing import Dict, Any, List, Optional, Union, Tuple
+from typing import Dict, Any, List, Optional, Set, Union, Tuple
 from datetime import datetime, timezone
 import math
-import aiohttp
+from functools import lru_cache
 from urllib.parse import urlparse
 import os
 import json
-import re
-import ssl
-from services.radar_parser.llm_async_adapter import build_llm_payload
+from radar_parser.app.export.columnar import default_sink
+from radar_parser.app.text.entities import default_extractor
+from services.radar_parser.item_store import entry_key
+from services.radar_parser.llm_async_adapter import _fingerprint, build_llm_payload_incremental, default_item_store, \
+    warm_records
+from .batch_scoring import FeatureMatrix
+from .collector import Collector
+from .keywords import KeywordMatcher
+from .llm_cache import LLMCache, make_key
+from .llm_client import LLM_CLIENT
+from .window import EventWindow, ScoredEvent
 
 TIME_DECAY_HALF_LIFE_HOURS = 6.0
 VELOCITY_SCALE = 3.0
+VELOCITY_LAST_N = 5
+TIMELINE_MAX = 10
 MAX_CONFIRMATIONS_NORM = 3.0
 STRICT_MODE = True
 
@@ -43,13 +53,15 @@ FIN_KEYWORDS = (
     "санкц", "ндс", "демпфер", "тариф", "квот", "пошлин", "бюджет", "рвп",
 )
 
-_TICKER_RE = re.compile(
-    r"\b(?:MCX:|TQBR:)?[A-Z]{2,5}(?:\.[A-Z])?\b|USD/RUB|EUR/RUB|BRENT|WTI",
-    re.IGNORECASE
-)
+STRICT_KEYWORDS = ("ставк", "инфляц", "индекс", "brent", "usd/rub", "eur/rub", "офз", "купон", "доходност")
+
+TEXT_MATCHER = KeywordMatcher({"fin": FIN_KEYWORDS, "strict": STRICT_KEYWORDS})
+PATH_MATCHER = KeywordMatcher({"allow": FIN_ALLOWED_SECTIONS, "block": FIN_BLOCK_SECTIONS})
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+# RADAR_LLM_URL — совместимый endpoint вместо OpenRouter (например, локальная заглушка llm_stub); ключ тогда не нужен
+LLM_URL_OVERRIDE = os.getenv("RADAR_LLM_URL")
+OPENROUTER_CHAT_URL = LLM_URL_OVERRIDE or "https://openrouter.ai/api/v1/chat/completions"
 
 SYSTEM_PROMPT = (
     '''Ты — RADAR.AI, автономный агент для анализа новостных потоков.
@@ -136,6 +148,10 @@ SUMMARY_SCHEMA_DESC = """Верни JSON строго в формате:
 Не придумывай фактов и новые события. Опираться только на входные items.
 """
 
+DRAFT_MODEL = "google/gemini-2.5-flash"
+SUMMARY_MODEL = "google/gemini-2.5-pro"
+LLM_CACHE = LLMCache()
+
 SOURCE_REPUTATION: Dict[str, float] = {
     "reuters.com": 0.96,
     "bloomberg.com": 0.95,
@@ -148,24 +164,6 @@ SOURCE_REPUTATION: Dict[str, float] = {
 }
 
 
-def _ssl_context() -> ssl.SSLContext:
-    """Создаёт SSL-контекст с доверенными корневыми сертификатами; учитывает SSL_CERT_FILE/SSL_CERT_DIR и certifi (если установлен)."""
-    ctx = ssl.create_default_context()
-    cafile = os.getenv("SSL_CERT_FILE")
-    capath = os.getenv("SSL_CERT_DIR")
-    if cafile or capath:
-        try:
-            ctx.load_verify_locations(cafile=cafile, capath=capath)
-        except Exception:
-            pass
-    try:
-        import certifi
-        ctx.load_verify_locations(certifi.where())
-    except Exception:
-        pass
-    return ctx
-
-
 def time_decay_score(dt: datetime, now: Optional[datetime] = None,
                      half_life_hours: float = TIME_DECAY_HALF_LIFE_HOURS) -> float:
     """Экспоненциальный скор свежести в [0,1] по возрасту события и полу-периоду."""
@@ -195,12 +193,11 @@ def get_source_reputation(url_or_source: str) -> float:
     return 0.4
 
 
+@lru_cache(maxsize=4096)
 def _path_flags(url: str) -> Tuple[bool, bool]:
     """Возвращает (allow, block) на основе рубрик в пути URL."""
-    u = (url or "").lower()
-    allow = any(s in u for s in FIN_ALLOWED_SECTIONS)
-    block = any(s in u for s in FIN_BLOCK_SECTIONS)
-    return allow, block
+    hits = PATH_MATCHER.match(url or "")
+    return bool(hits["allow"]), bool(hits["block"])
 
 
 def adjust_rep_by_path(rep: float, url: str) -> float:
@@ -221,6 +218,20 @@ def normalize_velocity(repeats: float, age_hours: float, has_time: bool) -> floa
     return math.tanh(rate / VELOCITY_SCALE)
 
 
+def arrival_velocity(arrivals: List[float], now: datetime) -> float:
+    """
+    Скорость распространения по реальным моментам появления членов кластера:
+    последние VELOCITY_LAST_N появлений делятся на время от самого раннего из них до now,
+    так что затихший сюжет теряет velocity, даже если когда-то перепечатывался быстро.
+    """
+    if len(arrivals) < 2:
+        return 0.0
+    n = min(len(arrivals) - 1, VELOCITY_LAST_N)
+    span_hours = (now.timestamp() - arrivals[-(n + 1)]) / 3600.0
+    rate = n / max(span_hours, 0.25)
+    return math.tanh(rate / VELOCITY_SCALE)
+
+
 def normalize_confirmations(num_links: int, repeat_count: int) -> float:
     """Нормализует подтверждения, ограничивая MAX_CONFIRMATIONS_NORM."""
     return min(1.0, num_links / MAX_CONFIRMATIONS_NORM)
@@ -231,12 +242,14 @@ def normalize_entities_count(n: int) -> float:
     return min(1.0, n / 3.0)
 
 
-def compute_financial_score(text: str, url: str, entities: Optional[Dict[str, Any]]) -> float:
-    """Возвращает скор финансовой релевантности по ключам, тикерам и рубрике URL."""
+def compute_financial_score(text: str, url: str, entities: Optional[Dict[str, Any]],
+                            hits: Optional[Dict[str, Set[str]]] = None) -> float:
+    """Возвращает скор финансовой релевантности по ключам, тикерам и рубрике URL; hits — готовый TEXT_MATCHER.match(text)."""
     t = (text or "").lower()
     allow, block = _path_flags(url)
-    kw_hit = any(k in t for k in FIN_KEYWORDS)
-    ticker_hit = bool(_TICKER_RE.search(t)) or bool((entities or {}).get("tickers"))
+    hits = hits if hits is not None else TEXT_MATCHER.match(t)
+    kw_hit = bool(hits["fin"])
+    ticker_hit = bool((entities or {}).get("tickers"))
     score = 0.0
     if allow:
         score += 0.40
@@ -257,8 +270,8 @@ def compute_hotness(features: Dict[str, float], weights: Dict[str, float] = WEIG
     return max(0.0, min(1.0, acc))
 
 
-def make_why_now(features: Dict[str, Any]) -> str:
-    """Формирует краткое объяснение «почему сейчас» по порогам фич."""
+def make_why_now(features: Dict[str, Any], terms: Optional[List[str]] = None) -> str:
+    """Формирует краткое объяснение «почему сейчас» по порогам фич; terms — сработавшие ключевые слова."""
     reasons = []
     if features.get("financial", 0.0) > 0.6:
         reasons.append("финансовая релевантность (сигнал)")
@@ -272,9 +285,10 @@ def make_why_now(features: Dict[str, Any]) -> str:
         reasons.append("источник с высокой репутацией")
     if features.get("entities", 0.0) > 0.6:
         reasons.append("широкий охват активов")
+    cite = f" Ключевые слова: {', '.join(terms[:5])}." if terms else ""
     if not reasons:
-        return "Накопление повторов и умеренная актуальность."
-    return ", ".join(reasons[:2]) + "."
+        return "Накопление повторов и умеренная актуальность." + cite
+    return ", ".join(reasons[:2]) + "." + cite
 
 
 def _coerce_items(data: Union[List[Dict[str, Any]], Dict[str, Any], None]) -> List[Dict[str, Any]]:
@@ -321,38 +335,33 @@ def _openrouter_headers() -> Dict[str, str]:
     return headers
 
 
-def _make_connector() -> aiohttp.TCPConnector:
-    """Создаёт aiohttp-коннектор с проверкой SSL (можно отключить через OPENROUTER_INSECURE_SSL=1)."""
-    if os.getenv("OPENROUTER_INSECURE_SSL") == "1":
-        return aiohttp.TCPConnector(ssl=False)
-    return aiohttp.TCPConnector(ssl=_ssl_context())
+def _cache_model(model: str) -> str:
+    """Модель для ключа кэша: ответы переопределённого endpoint не смешиваются с ответами OpenRouter."""
+    return f"{model}@{LLM_URL_OVERRIDE}" if LLM_URL_OVERRIDE else model
+
+
+def _llm_enabled() -> bool:
+    """LLM доступна, если задан ключ OpenRouter или переопределён endpoint (RADAR_LLM_URL)."""
+    return bool(OPENROUTER_API_KEY or LLM_URL_OVERRIDE)
 
 
 async def _post_openrouter(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Отправляет POST на OpenRouter и возвращает распарсенный JSON либо подробную ошибку."""
-    if not OPENROUTER_API_KEY:
+    """Отправляет POST на OpenRouter через общий клиент и возвращает распарсенный JSON либо подробную ошибку."""
+    if not _llm_enabled():
         raise RuntimeError("OPENROUTER_API_KEY is not set")
-    async with aiohttp.ClientSession(connector=_make_connector()) as s:
-        async with s.post(OPENROUTER_CHAT_URL, json=payload, headers=_openrouter_headers(), timeout=60) as resp:
-            text = await resp.text()
-            if resp.status != 200:
-                raise RuntimeError(f"OpenRouter HTTP {resp.status}: {text[:300]}")
-            try:
-                return json.loads(text)
-            except Exception as e:
-                raise RuntimeError(f"OpenRouter JSON parse error: {e}; payload: {text[:300]}")
+    return await LLM_CLIENT.post_json(OPENROUTER_CHAT_URL, payload, _openrouter_headers(), timeout=60)
 
 
 async def generate_draft_openrouter(item: Dict[str, Any], system_prompt: str = SYSTEM_PROMPT) -> str:
     """Генерирует драфт по одному событию через OpenRouter; возвращает текст ассистента."""
-    if not OPENROUTER_API_KEY:
+    if not _llm_enabled():
         return ""
     text = (item.get("text") or "")[:3000]
     links = item.get("links") or []
     entities = item.get("entities") or {}
     user_prompt = f"TEXT:\n{text}\n\nLINKS:\n{', '.join(links[:5])}\n\nENTITIES:\n{entities}\n"
     payload = {
-        "model": "google/gemini-2.5-flash",
+        "model": DRAFT_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
@@ -360,36 +369,51 @@ async def generate_draft_openrouter(item: Dict[str, Any], system_prompt: str = S
         "max_tokens": 800,
         "temperature": 0.3,
     }
-    j = await _post_openrouter(payload)
-    try:
-        content = j["choices"][0]["message"]["content"]
-        return (content or "").strip()
-    except Exception as e:
-        raise RuntimeError(f"OpenRouter schema mismatch: {e}; keys={list(j.keys())}")
+
+    async def _call() -> str:
+        j = await _post_openrouter(payload)
+        try:
+            content = j["choices"][0]["message"]["content"]
+            return (content or "").strip()
+        except Exception as e:
+            raise RuntimeError(f"OpenRouter schema mismatch: {e}; keys={list(j.keys())}")
+
+    return await LLM_CACHE.get_or_compute(make_key(_cache_model(DRAFT_MODEL), system_prompt, user_prompt), _call)
+
+
+def _summary_cache_input(compact_items: List[Dict[str, Any]]) -> str:
+    """Вход для ключа сводки: числа огрублены до 0.01, чтобы дрейф recency между запросами не сбивал кэш."""
+    coarse = [{k: round(v, 2) if isinstance(v, float) else v for k, v in x.items()} for x in compact_items]
+    return json.dumps(coarse, ensure_ascii=False, sort_keys=True)
+
+
+def _local_summary(items_out: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Сводка без LLM — по среднему hotness топа."""
+    if not items_out:
+        return {
+            "impact_level": "нет",
+            "summary": "Релевантных событий не выявлено; влияния на российский рынок нет.",
+            "watchlist": [],
+            "rationale": "Пустой список событий."
+        }
+    avg_hot = sum(i.get("hotness", 0.0) for i in items_out) / max(1, len(items_out))
+    if avg_hot < 0.2:
+        level, msg = "нет", "Существенного влияния на российский рынок не ожидается."
+    elif avg_hot < 0.4:
+        level, msg = "низкое", "Влияние ограниченное; существенных драйверов для RU рынка не просматривается."
+    elif avg_hot < 0.7:
+        level, msg = "среднее", "Есть умеренные факторы влияния; реакция может быть точечной по секторам."
+    else:
+        level, msg = "высокое", "Высокая значимость событий; возможно влияние на индекс и рубль."
+    return {"impact_level": level, "summary": msg, "watchlist": [],
+            "rationale": f"Локальный фолбэк по среднему hotness={avg_hot:.2f}."}
 
 
 async def generate_overall_summary_openrouter(items_out: List[Dict[str, Any]],
                                               system_prompt: str = SYSTEM_PROMPT) -> Dict[str, Any]:
     """Строит сводное резюме по рынку из топ-событий (LLM) или локальный фолбэк по hotness."""
-    if not OPENROUTER_API_KEY:
-        if not items_out:
-            return {
-                "impact_level": "нет",
-                "summary": "Релевантных событий не выявлено; влияния на российский рынок нет.",
-                "watchlist": [],
-                "rationale": "Пустой список событий."
-            }
-        avg_hot = sum(i.get("hotness", 0.0) for i in items_out) / max(1, len(items_out))
-        if avg_hot < 0.2:
-            level, msg = "нет", "Существенного влияния на российский рынок не ожидается."
-        elif avg_hot < 0.4:
-            level, msg = "низкое", "Влияние ограниченное; существенных драйверов для RU рынка не просматривается."
-        elif avg_hot < 0.7:
-            level, msg = "среднее", "Есть умеренные факторы влияния; реакция может быть точечной по секторам."
-        else:
-            level, msg = "высокое", "Высокая значимость событий; возможно влияние на индекс и рубль."
-        return {"impact_level": level, "summary": msg, "watchlist": [],
-                "rationale": f"Локальный фолбэк по среднему hotness={avg_hot:.2f}."}
+    if not _llm_enabled():
+        return _local_summary(items_out)
 
     compact_items = []
     for x in items_out[:10]:
@@ -415,7 +439,7 @@ async def generate_overall_summary_openrouter(items_out: List[Dict[str, Any]],
         f"{SUMMARY_SCHEMA_DESC}"
     )
     payload = {
-        "model": "google/gemini-2.5-pro",
+        "model": SUMMARY_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
@@ -423,138 +447,349 @@ async def generate_overall_summary_openrouter(items_out: List[Dict[str, Any]],
         "max_tokens": 600,
         "temperature": 0.2,
     }
-    j = await _post_openrouter(payload)
-    content = j["choices"][0]["message"]["content"].strip()
-    try:
-        parsed = json.loads(content)
-        if not isinstance(parsed, dict):
-            raise ValueError("not a dict")
-        for k in ("impact_level", "summary", "watchlist", "rationale"):
-            parsed.setdefault(k, "" if k != "watchlist" else [])
-        return parsed
-    except Exception:
-        return {
-            "impact_level": "низкое" if len(items_out) and (
-                        sum(i.get("hotness", 0.0) for i in items_out) / len(items_out) < 0.4) else "среднее",
-            "summary": content[:1200],
-            "watchlist": [],
-            "rationale": "Модель вернула не-JSON; контент сохранён как summary."
-        }
 
-
-async def get_top_k(window: int = 24, k: int = 5,
-                    items: Optional[Union[List[Dict[str, Any]], Dict[str, Any]]] = None) -> Dict[str, Any]:
-    """Возвращает топ-k горячих событий и сводку влияния на рынок РФ."""
-    data = _coerce_items(items)
-    if not data:
-        data = await build_llm_payload(window)
+    async def _call() -> Dict[str, Any]:
+        j = await _post_openrouter(payload)
+        content = j["choices"][0]["message"]["content"].strip()
         try:
-            open('data.json', 'w').write(json.dumps(data, ensure_ascii=False, indent=2))
+            parsed = json.loads(content)
+            if not isinstance(parsed, dict):
+                raise ValueError("not a dict")
+            for k in ("impact_level", "summary", "watchlist", "rationale"):
+                parsed.setdefault(k, "" if k != "watchlist" else [])
+            return parsed
         except Exception:
-            pass
+            return {
+                "impact_level": "низкое" if len(items_out) and (
+                            sum(i.get("hotness", 0.0) for i in items_out) / len(items_out) < 0.4) else "среднее",
+                "summary": content[:1200],
+                "watchlist": [],
+                "rationale": "Модель вернула не-JSON; контент сохранён как summary."
+            }
 
-    now = datetime.now(timezone.utc)
-    items_out: List[Dict[str, Any]] = []
+    key = make_key(_cache_model(SUMMARY_MODEL), system_prompt, SUMMARY_SCHEMA_DESC + _summary_cache_input(compact_items))
+    return await LLM_CACHE.get_or_compute(key, _call)
 
-    for it in data:
-        raw_time = it.get("Время выхода") or it.get("time") or it.get("time_published")
-        t_dt, has_time = _safe_parse_time(raw_time, now)
-        age_hours = max(0.0, (now - t_dt).total_seconds() / 3600.0)
-        recency = time_decay_score(t_dt, now) if has_time else 0.0
-
-        repeats = float(it.get("количество повторений", it.get("количество повторяшек", it.get("repeat_count", 1))))
-        inner_links = (
-                it.get("список ссылок внутри текста")
-                or it.get("links_in_text")
-                or it.get("links", [])
-                or []
-        )
-        num_links = len(inner_links)
-
-        url = (
-                it.get("ссылка на саму статью")
-                or it.get("article_url")
-                or it.get("url")
-                or (it.get("source") if (it.get("source") and str(it.get("source")).startswith("http")) else "")
-        )
-        source_field = it.get("источник") or it.get("source") or ""
-        source_rep = get_source_reputation(url or source_field)
-        source_rep = adjust_rep_by_path(source_rep, url or "")
-
-        entities = it.get("entities") or it.get("список сущностей") or {}
-        entities_norm = normalize_entities_count(
-            len(entities.get("tickers", [])) if isinstance(entities, dict) else 0
-        )
-
-        text_for_score = it.get("текст статьи") or it.get("text") or ""
-        fin_score = compute_financial_score(text_for_score, url or "", entities)
-        if fin_score < 0.30:
-            continue
-
-        if STRICT_MODE:
-            low = text_for_score.lower()
-            strict_hit = bool(_TICKER_RE.search(text_for_score)) or any(
-                key in low for key in
-                ("ставк", "инфляц", "индекс", "brent", "usd/rub", "eur/rub", "офз", "купон", "доходност")
-            )
-            if not strict_hit:
-                continue
-
-        velocity = normalize_velocity(repeats, age_hours, has_time)
-        confirmations = normalize_confirmations(num_links, int(repeats))
-
-        features = {
-            "financial": fin_score,
-            "recency": recency,
-            "velocity": velocity,
-            "confirmations": confirmations,
-            "source_rep": source_rep,
-            "entities": entities_norm
-        }
 
-        hotness = compute_hotness(features)
-        why_now = make_why_now(features)
-
-        draft = ""
-        if OPENROUTER_API_KEY:
-            try:
-                draft = await generate_draft_openrouter({
-                    "text": text_for_score,
-                    "links": inner_links,
-                    "entities": entities
-                })
-            except Exception as e:
-                draft = f"LLM error: {e}"
-
-        headline = None
-        if draft:
-            first_line = draft.splitlines()[0].strip()
-            if first_line:
-                headline = first_line[:120]
-        if not headline:
-            txt = (text_for_score or "").strip()
-            headline = (txt.split(".")[0] if "." in txt else txt)[:120] or None
-
-        items_out.append({
-            "headline": headline,
-            "hotness": round(hotness, 4),
-            "why_now": why_now,
+def _item_text(it: Dict[str, Any]) -> str:
+    """Текст записи в LLM-схеме или в «сыром» формате."""
+    return it.get("текст статьи") or it.get("text") or ""
+
+
+def _item_links(it: Dict[str, Any]) -> List[str]:
+    """Ссылки внутри текста записи."""
+    return (
+            it.get("список ссылок внутри текста")
+            or it.get("links_in_text")
+            or it.get("links", [])
+            or []
+    )
+
+
+def _item_url(it: Dict[str, Any]) -> str:
+    """Ссылка на саму статью (или source, если он задан URL)."""
+    return (
+            it.get("ссылка на саму статью")
+            or it.get("article_url")
+            or it.get("url")
+            or (it.get("source") if (it.get("source") and str(it.get("source")).startswith("http")) else "")
+    )
+
+
+def _make_headline(draft: str, text: str) -> Optional[str]:
+    """Заголовок — первая строка драфта, иначе первое предложение текста."""
+    if draft:
+        first_line = draft.splitlines()[0].strip()
+        if first_line:
+            return first_line[:120]
+    txt = (text or "").strip()
+    return (txt.split(".")[0] if "." in txt else txt)[:120] or None
+
+
+def _score_static(it: Dict[str, Any], now: datetime) -> Optional[ScoredEvent]:
+    """Считает не зависящую от текущего времени часть скоринга; None — запись не прошла фильтры."""
+    raw_time = it.get("Время выхода") or it.get("time") or it.get("time_published")
+    t_dt, has_time = _safe_parse_time(raw_time, now)
+
+    repeats = float(it.get("количество повторений", it.get("количество повторяшек", it.get("repeat_count", 1))))
+    inner_links = _item_links(it)
+    num_links = len(inner_links)
+
+    url = _item_url(it)
+    source_field = it.get("источник") or it.get("source") or ""
+    source_rep = get_source_reputation(url or source_field)
+    source_rep = adjust_rep_by_path(source_rep, url or "")
+
+    entities = it.get("entities", it.get("список сущностей"))
+    if not isinstance(entities, dict):
+        # записи не из пайплайна (явные items, сущности списком строк) — извлекаем один раз здесь;
+        # пайплайн кладёт словарь при приёме
+        entities = default_extractor().extract(_item_text(it))
+    entities_norm = normalize_entities_count(len(entities.get("tickers", [])))
+
+    text_for_score = _item_text(it)
+    hits = TEXT_MATCHER.match(text_for_score)
+    fin_score = compute_financial_score(text_for_score, url or "", entities, hits=hits)
+    if fin_score < 0.30:
+        return None
+
+    if STRICT_MODE:
+        strict_hit = bool(entities.get("tickers")) or bool(hits["strict"])
+        if not strict_hit:
+            return None
+
+    confirmations = normalize_confirmations(num_links, int(repeats))
+    dedup_group = it.get("dedup_group") or f"article:{url or (it.get('id') or '')}"
+
+    return ScoredEvent(
+        # ключ как в ItemStore: канонический URL, без ссылки — отпечаток текста (не группа: иначе
+        # пересказы одного кластера без ссылок затирали бы друг друга в окне)
+        key=entry_key(url or None, _fingerprint(text_for_score)),
+        group=dedup_group,
+        time=t_dt,
+        has_time=has_time,
+        repeats=repeats,
+        ingested_at=now,
+        arrivals=list(it.get("arrivals") or []),
+        payload={
+            "headline": _make_headline("", text_for_score),
             "entities": entities,
             "sources": (inner_links[:5]) if inner_links else ([url] if url else []),
-            "timeline": [{"time": t_dt.isoformat(), "url": url}],
-            "draft": draft,
-            "dedup_group": it.get("dedup_group") or f"article:{url or (it.get('id') or '')}",
+            "timeline": [{"time": t_dt.isoformat() if has_time else None, "source": source_field or None, "url": url}],
+            "draft": "",
+            "dedup_group": dedup_group,
             "raw_item": it,
-            "features": features
-        })
+            "source": source_field,
+            "matched_terms": sorted(hits["fin"] | hits["strict"]),
+            "features": {
+                "financial": fin_score,
+                "confirmations": confirmations,
+                "source_rep": source_rep,
+                "entities": entities_norm,
+            },
+        },
+    )
+
+
+def _finalize(ev: ScoredEvent, now: datetime) -> Dict[str, Any]:
+    """Досчитывает зависящие от времени фичи (recency, velocity) и hotness события."""
+    age_hours = max(0.0, (now - ev.time).total_seconds() / 3600.0)
+    static = ev.payload["features"]
+    features = {
+        "financial": static["financial"],
+        "recency": time_decay_score(ev.time, now) if ev.has_time else 0.0,
+        "velocity": arrival_velocity(ev.arrivals, now) if ev.arrivals
+        else normalize_velocity(ev.repeats, age_hours, ev.has_time),
+        "confirmations": static["confirmations"],
+        "source_rep": static["source_rep"],
+        "entities": static["entities"],
+    }
+    hotness = compute_hotness(features)
+    p = ev.payload
+    return {
+        "headline": p["headline"],
+        "hotness": round(hotness, 4),
+        "why_now": make_why_now(features, p.get("matched_terms")),
+        "entities": p["entities"],
+        "sources": p["sources"],
+        "timeline": p["timeline"],
+        "draft": p["draft"],
+        "dedup_group": p["dedup_group"],
+        "raw_item": p["raw_item"],
+        "features": features
+    }
+
+
+def _with_cluster(row: Dict[str, Any], members: List[ScoredEvent]) -> Dict[str, Any]:
+    """Таймлайн и источники строки топа — по всем членам её кластера в окне."""
+    if len(members) < 2:
+        return row
+    ms = sorted(members, key=lambda m: (not m.has_time, m.time))
+    row["timeline"] = [entry for m in ms for entry in m.payload["timeline"]][:TIMELINE_MAX]
+    urls = [e["url"] for e in row["timeline"] if e.get("url")] + list(row["sources"])
+    row["sources"] = list(dict.fromkeys(urls))[:5]
+    return row
+
+
+async def _export_scores(scored: List[Tuple[ScoredEvent, Dict[str, Any]]], now: datetime,
+                         first_rank: Optional[int] = None) -> None:
+    """
+    Дописывает векторы фич в колоночный экспорт (RADAR_EXPORT_DIR, датасет scores) для бэктестов:
+    снимок при оценке нового события (rank пуст) или строки отданного топа (rank с first_rank).
+    """
+    sink = default_sink("scores")
+    if sink is None or not scored:
+        return
+    await sink.append_async([{
+        **row["features"],
+        "published": ev.time if ev.has_time else None,
+        "scored_at": now,
+        "source": ev.payload.get("source"),
+        "url": ev.payload["raw_item"].get("ссылка на саму статью"),
+        "dedup_group": ev.group,
+        "tickers": ev.payload["entities"].get("tickers", []),
+        "rank": None if first_rank is None else first_rank + i,
+        "hotness": row["hotness"],
+        "repeats": int(ev.repeats),
+    } for i, (ev, row) in enumerate(scored)])
+
+
+def _feature_matrix(events: List[ScoredEvent]) -> FeatureMatrix:
+    return FeatureMatrix(events, WEIGHTS, TIME_DECAY_HALF_LIFE_HOURS, VELOCITY_SCALE, VELOCITY_LAST_N)
+
+
+def _ingest(data: List[Dict[str, Any]], now: datetime) -> List[ScoredEvent]:
+    """Оценивает записи; драфты здесь не генерируются — только для итогового топа (см. _draft_top)."""
+    events: List[ScoredEvent] = []
+    for it in data:
+        ev = _score_static(it, now)
+        if ev is not None:
+            events.append(ev)
+    return events
+
+
+LLM_CONCURRENCY = int(os.getenv("RADAR_LLM_CONCURRENCY", "4"))
+LLM_TIMEOUT_S = float(os.getenv("RADAR_LLM_TIMEOUT", "45"))
+_LLM_SEM: Optional[asyncio.Semaphore] = None
+
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    """Общий на процесс семафор: ограничивает число одновременных LLM-вызовов по всем запросам."""
+    global _LLM_SEM
+    if _LLM_SEM is None:
+        _LLM_SEM = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _LLM_SEM
+
 
-    items_out.sort(key=lambda x: x["hotness"], reverse=True)
-    top_items = items_out[:k]
-    overall_summary = await generate_overall_summary_openrouter(top_items)
+async def _draft_one(ev: ScoredEvent, row: Dict[str, Any]) -> None:
+    """Генерирует драфт события с таймаутом; удачный драфт запоминается в событии окна."""
+    if ev.payload.get("draft"):
+        return
+    it = ev.payload["raw_item"]
+    async with _llm_semaphore():
+        try:
+            draft = await asyncio.wait_for(generate_draft_openrouter({
+                "text": _item_text(it),
+                "links": _item_links(it),
+                "entities": ev.payload["entities"]
+            }), LLM_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            row["draft"] = f"LLM error: timeout after {LLM_TIMEOUT_S:g}s"
+            return
+        except Exception as e:
+            row["draft"] = f"LLM error: {e}"
+            return
+    ev.payload["draft"] = draft
+    ev.payload["headline"] = _make_headline(draft, _item_text(it))
+    row["draft"] = draft
+    row["headline"] = ev.payload["headline"]
+
+
+async def _summary_top(items_out: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Сводка с тем же дедлайном, что у драфтов; по таймауту или ошибке LLM — локальный фолбэк."""
+    try:
+        return await asyncio.wait_for(generate_overall_summary_openrouter(items_out), LLM_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        reason = f"LLM error: timeout after {LLM_TIMEOUT_S:g}s"
+    except Exception as e:
+        reason = f"LLM error: {e}"
+    summary = _local_summary(items_out)
+    summary["rationale"] = f"{summary['rationale']} ({reason})"
+    return summary
+
+
+async def _draft_top(top: List[Tuple[ScoredEvent, Dict[str, Any]]]) -> None:
+    """Драфты только для итогового топ-k, параллельно под _llm_semaphore()."""
+    if not _llm_enabled():
+        return
+    await asyncio.gather(*(_draft_one(ev, row) for ev, row in top))
+
+
+RETAIN_HOURS = float(os.getenv("RADAR_RETAIN_HOURS", "48"))
+WINDOW = EventWindow()
+
+
+def warm_window(now: Optional[datetime] = None) -> None:
+    """Один раз за процесс поднимает WINDOW из ItemStore — после перезапуска окно доступно без обхода лент."""
+    if WINDOW.loaded:
+        return
+    now = now or datetime.now(timezone.utc)
+    for ev in _ingest(warm_records(default_item_store(), RETAIN_HOURS, now.timestamp()), now):
+        WINDOW.add(ev)
+    WINDOW.loaded = True
+
+
+async def _refresh_window(window: int, now: Optional[datetime] = None) -> None:
+    """Подтягивает в WINDOW только новые записи (они же сохраняются в ItemStore)."""
+    now = now or datetime.now(timezone.utc)
+    warm_window(now)
+    data = await build_llm_payload_incremental(window, default_item_store())
+    events = _ingest(data, now)
+    for ev in events:
+        WINDOW.add(ev)
+    if default_sink("scores") is not None:
+        await _export_scores([(ev, _finalize(ev, now)) for ev in events], now)
+    WINDOW.evict(now, max(RETAIN_HOURS, float(window)))
+
+
+COLLECTOR = Collector(_refresh_window)
+_MATRIX: Dict[str, Any] = {"version": None, "matrix": None}
+
+
+def _window_matrix() -> FeatureMatrix:
+    """FeatureMatrix всего WINDOW; пересобирается только после изменений окна."""
+    if _MATRIX["version"] != WINDOW.version:
+        _MATRIX["matrix"] = _feature_matrix(list(WINDOW.events.values()))
+        _MATRIX["version"] = WINDOW.version
+    return _MATRIX["matrix"]
+
+
+async def get_top_k(window: int = 24, k: int = 5,
+                    items: Optional[Union[List[Dict[str, Any]], Dict[str, Any]]] = None,
+                    offset: int = 0, min_hotness: float = 0.0,
+                    source: Optional[str] = None, ticker: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Возвращает топ-k горячих событий и сводку влияния на рынок РФ.
+
+    Без явных items читает предрасчитанный индекс окна (FeatureMatrix), который обновляет фоновый
+    COLLECTOR. Окно поднимается из ItemStore, поэтому при работающем фоновом сборщике запрос сразу
+    отвечает по сохранённой истории; сбор из запроса запускается, только если окно пустое или
+    устарело без фонового цикла (и тогда общий на всех).
+    offset/min_hotness/source/ticker применяются в индексе до сборки строк.
+    """
+    data = _coerce_items(items)
+    filters = dict(offset=offset, min_hotness=min_hotness, source=source, ticker=ticker)
+    if data:
+        now = datetime.now(timezone.utc)
+        events = _ingest(data, now)
+        groups: Dict[str, List[ScoredEvent]] = {}
+        for ev in events:
+            groups.setdefault(ev.group, []).append(ev)
+        top_events, total = _feature_matrix(events).query(now, k, **filters)
+        members = {ev.group: groups[ev.group] for ev in top_events}
+    else:
+        warm_window()
+        if COLLECTOR.is_stale() and not (len(WINDOW) and COLLECTOR.running):
+            await COLLECTOR.refresh(window)
+        now = datetime.now(timezone.utc)
+        top_events, total = _window_matrix().query(now, k, window, **filters)
+        members = {ev.group: WINDOW.members(ev.group, now, window) for ev in top_events}
+
+    # полные строки (why_now, таймлайн кластера) собираются только для топа
+    top = [(ev, _with_cluster(_finalize(ev, now), members[ev.group])) for ev in top_events]
+    top_items = [row for _, row in top]
+    await _export_scores(top, now, first_rank=offset + 1)
+    # сводка строится по hotness/why_now/фичам топа и не ждёт драфтов
+    _, overall_summary = await asyncio.gather(
+        _draft_top(top),
+        _summary_top([dict(row) for row in top_items]),
+    )
 
     return {
         "items": top_items,
         "generated_at": now.isoformat(),
         "k": k,
+        "offset": offset,
+        "total": total,
         "overall_summary": overall_summary
     }
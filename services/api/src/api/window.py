@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+
+@dataclass
+class ScoredEvent:
+    """Событие со статической частью скоринга; recency/velocity/hotness досчитываются на чтении."""
+    key: str
+    group: str
+    time: datetime
+    has_time: bool
+    repeats: float
+    ingested_at: datetime
+    payload: Dict[str, Any]
+    arrivals: List[float] = field(default_factory=list)
+
+
+class EventWindow:
+    """Удерживаемое окно уже оценённых событий, в которое вливаются только новые записи."""
+
+    def __init__(self):
+        self.events: Dict[str, ScoredEvent] = {}
+        self.groups: Dict[str, set] = {}
+        self.loaded = False
+        self.version = 0  # растёт при любом изменении состава/повторов — ключ кэша FeatureMatrix
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def add(self, ev: ScoredEvent) -> None:
+        """Добавляет событие и синхронизирует число повторов и моменты появления по всей его dedup-группе."""
+        self.version += 1
+        self.events[ev.key] = ev
+        members = self.groups.setdefault(ev.group, set())
+        members.add(ev.key)
+        for key in members:
+            other = self.events.get(key)
+            if other is not None and other.repeats < ev.repeats:
+                other.repeats = ev.repeats
+                other.arrivals = ev.arrivals
+
+    def evict(self, now: datetime, hours: float) -> int:
+        """Удаляет события старше hours (по времени публикации, а без него — по времени приёма)."""
+        cutoff = now - timedelta(hours=hours)
+        stale = [k for k, ev in self.events.items() if (ev.time if ev.has_time else ev.ingested_at) < cutoff]
+        if stale:
+            self.version += 1
+        for k in stale:
+            ev = self.events.pop(k)
+            members = self.groups.get(ev.group)
+            if members is not None:
+                members.discard(k)
+                if not members:
+                    del self.groups[ev.group]
+        return len(stale)
+
+    def members(self, group: str, now: datetime, hours: Optional[float] = None) -> List[ScoredEvent]:
+        """События dedup-группы, попадающие в окно hours."""
+        evs = [self.events[k] for k in self.groups.get(group, ()) if k in self.events]
+        if hours is None:
+            return evs
+        cutoff = now - timedelta(hours=hours)
+        return [ev for ev in evs if (ev.time if ev.has_time else ev.ingested_at) >= cutoff]
+
+    def select(self, now: datetime, hours: Optional[float] = None) -> List[ScoredEvent]:
+        """Возвращает события окна за последние hours часов."""
+        if hours is None:
+            return list(self.events.values())
+        cutoff = now - timedelta(hours=hours)
+        return [ev for ev in self.events.values() if (ev.time if ev.has_time else ev.ingested_at) >= cutoff]
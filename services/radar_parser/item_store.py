@@ -0,0 +1,172 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from radar_parser.app.dedup.dedup import _canonical_url
+from services.radar_parser.llm_async_adapter import _fingerprint
+
+CACHE_DIR = os.getenv("RADAR_CACHE_DIR", ".radar_cache")
+RETAIN_HOURS = float(os.getenv("RADAR_RETAIN_HOURS", "48"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key        TEXT PRIMARY KEY,
+    url        TEXT,
+    fp         TEXT,
+    source     TEXT,
+    published  TEXT,
+    window_ts  REAL NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL,
+    record     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_window ON items(window_ts);
+CREATE INDEX IF NOT EXISTS items_source ON items(source, window_ts);
+CREATE INDEX IF NOT EXISTS items_url ON items(url);
+CREATE INDEX IF NOT EXISTS items_fp ON items(fp);
+CREATE INDEX IF NOT EXISTS items_last_seen ON items(last_seen);
+"""
+
+
+def entry_key(link: Optional[str], fp: Optional[str] = None) -> Optional[str]:
+    """Ключ записи: канонический URL, а для записей без ссылки — отпечаток текста."""
+    if link:
+        return _canonical_url(link)
+    if fp:
+        return f"fp:{fp}"
+    return None
+
+
+def _published_ts(published: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(published).timestamp() if published else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ItemStore:
+    """
+    Хранилище записей окна в SQLite (RADAR_CACHE_DIR/items.sqlite, WAL).
+
+    Одна строка на запись в LLM-схеме: ключ (канонический URL или fp:<отпечаток>), источник,
+    время выхода, когда запись впервые и в последний раз видели в лентах, и сама запись в JSON.
+    Индексы по времени окна (выход, а без него — первое появление), источнику, URL и отпечатку:
+    окно читается запросом по диапазону, и после перезапуска/падения API поднимается без обхода лент.
+    Отметки «видели снова» копятся в памяти и пишутся вместе с новыми записями в save().
+    """
+
+    def __init__(self, path: Optional[str] = None, retain_hours: float = RETAIN_HOURS):
+        self.path = Path(path or Path(CACHE_DIR) / "items.sqlite")
+        self.retain_hours = retain_hours
+        self._touched: Dict[str, float] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        if not len(self):
+            self._import_seen_json(self.path.parent / "seen.json")
+
+    def _import_seen_json(self, legacy: Path) -> None:
+        """Однократный перенос прежнего реестра seen.json, чтобы обновление не обнуляло окно."""
+        try:
+            with open(legacy, encoding="utf-8") as f:
+                entries = json.load(f).get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            return
+        for key, e in entries.items():
+            if e.get("record"):
+                self._upsert(key, e["record"], e.get("first_seen") or time.time(), e.get("last_seen"))
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        return bool(key) and self.db.execute(
+            "SELECT 1 FROM items WHERE key = ?", (key,)).fetchone() is not None
+
+    def is_seen(self, key: Optional[str], now: Optional[float] = None) -> bool:
+        if not key:
+            return False
+        if key not in self._touched and key not in self:
+            return False
+        self._touched[key] = now or time.time()
+        return True
+
+    def _upsert(self, key: str, record: Dict[str, Any], now: float, last_seen: Optional[float] = None) -> None:
+        published = record.get("Время выхода")
+        ts = _published_ts(published)
+        # url/fp заполняются у каждой строки: перепечатку ищут и по ссылке, и по тексту
+        link = record.get("ссылка на саму статью")
+        text = record.get("текст статьи")
+        fp = _fingerprint(text) if text else (key[3:] if key.startswith("fp:") else None)
+        self.db.execute(
+            "INSERT INTO items(key, url, fp, source, published, window_ts, first_seen, last_seen, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen), "
+            "url = excluded.url, fp = excluded.fp",
+            (key, _canonical_url(link) if link else None, fp, record.get("источник"), published,
+             ts if ts is not None else now, now, last_seen or now,
+             json.dumps(record, ensure_ascii=False)))
+
+    def add(self, key: str, record: Dict[str, Any], now: Optional[float] = None) -> None:
+        self.upsert_many([(key, record)], now)
+
+    def upsert_many(self, rows: Iterable[Tuple[str, Dict[str, Any]]], now: Optional[float] = None) -> int:
+        """Пакетная вставка (key, record); уже известные ключи лишь продлевают last_seen."""
+        now = now or time.time()
+        n = 0
+        for key, record in rows:
+            self._upsert(key, record, now)
+            n += 1
+        return n
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute("SELECT record FROM items WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, since: Optional[float] = None, until: Optional[float] = None,
+                source: Optional[str] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """(key, first_seen, record) окна [since, until) по времени выхода, опционально одного источника."""
+        where, args = [], []
+        if since is not None:
+            where.append("window_ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("window_ts < ?")
+            args.append(until)
+        if source is not None:
+            where.append("source = ?")
+            args.append(source)
+        sql = "SELECT key, first_seen, record FROM items"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self.db.execute(sql + " ORDER BY window_ts", args).fetchall()
+        return [(key, first_seen, json.loads(rec)) for key, first_seen, rec in rows]
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Удаляет записи, которые не видели ни в одной ленте дольше retain_hours."""
+        self._flush_touched()
+        cutoff = (now or time.time()) - self.retain_hours * 3600.0
+        return self.db.execute("DELETE FROM items WHERE last_seen < ?", (cutoff,)).rowcount
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self.db.executemany("UPDATE items SET last_seen = MAX(last_seen, ?) WHERE key = ?",
+                                [(ts, key) for key, ts in self._touched.items()])
+            self._touched.clear()
+
+    def save(self) -> None:
+        self._flush_touched()
+        self.db.commit()
+
+    def close(self) -> None:
+        self.save()
+        self.db.close()
@@ -1,11 +1,17 @@
 from __future__ import annotations
-import asyncio, re, html, hashlib
-from typing import List, Dict, Any, Optional
+import re, html, hashlib, time
+from typing import List, Dict, Any, Optional, Tuple, Union, TYPE_CHECKING
 from zoneinfo import ZoneInfo
 from datetime import datetime, timezone
 from bs4 import BeautifulSoup
 from dateutil import parser as dtp, tz
 
+if TYPE_CHECKING:
+    from services.radar_parser.item_store import ItemStore
+    from radar_parser.app.dedup.cluster import Cluster, ClusterIndex
+    from radar_parser.app.dedup.cluster_store import SqliteClusterIndex
+    from radar_parser.app.schedule.poll_scheduler import PollScheduler
+
 TARGET_TZ = ZoneInfo("Europe/Moscow")
 TZINFOS = {
     "UTC": tz.UTC, "GMT": tz.UTC,
@@ -147,7 +153,34 @@ def _is_bad_link(link: Optional[str]) -> bool:
     return ("localhost:" in l) or ("rss-bridge" in l)
 
 
-def _to_llm_schema(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _item_body(it: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """Очищенный текст записи (заголовок и анонс) и ссылки внутри него."""
+    title = it.get("title") or ""
+    summary = it.get("summary") or it.get("description") or ""
+    raw = f"{title}. {summary}".strip(". ")
+
+    body, inner_links = _extract_text_and_links(raw)
+    if len(body) < 25:  # иногда только заголовок информативен
+        t_only, _ = _extract_text_and_links(title)
+        if len(t_only) > len(body):
+            body = t_only
+    return body, inner_links
+
+
+def _item_key(it: Dict[str, Any]) -> Optional[str]:
+    """Ключ записи пайплайна в ItemStore до _to_llm_schema: URL, а без ссылки — отпечаток очищенного текста."""
+    from services.radar_parser.item_store import entry_key
+
+    link = it.get("link")
+    if link:
+        return entry_key(link)
+    body, _ = _item_body(it)
+    return entry_key(None, _fingerprint(body or it.get("title") or ""))
+
+
+def _to_llm_schema(items: List[Dict[str, Any]],
+                   index: Optional[Union[ClusterIndex, SqliteClusterIndex]] = None,
+                   now: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     Преобразует items -> список словарей вида:
     {
@@ -156,22 +189,26 @@ def _to_llm_schema(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
       "текст статьи": str (очищенный),
       "список ссылок внутри текста": [str, ...],
       "ссылка на саму статью": str|None,
-      "количество повторений": int
+      "количество повторений": int,
+      "entities": {"tickers": [...], "names": [...]} (по словарю инструментов),
+      "dedup_group": str
     }
+    Повторы считаются по кластерам почти-дубликатов (MinHash/LSH): пересказ одной новости
+    разными изданиями попадает в один dedup_group. index — индекс кластеров окна; без него
+    кластеры строятся только по переданным items. now — момент приёма (epoch) для velocity;
+    по умолчанию текущее время, при реплее — симулированные часы.
     """
+    from radar_parser.app.dedup.cluster import ClusterIndex
+    from radar_parser.app.text.entities import default_extractor
+    from services.radar_parser.item_store import entry_key
+
+    index = index if index is not None else ClusterIndex()
+    extractor = default_extractor()
     tmp: List[Dict[str, Any]] = []
-    freq: Dict[str, int] = {}
 
     for it in items:
         title = it.get("title") or ""
-        summary = it.get("summary") or it.get("description") or ""
-        raw = f"{title}. {summary}".strip(". ")
-
-        body, inner_links = _extract_text_and_links(raw)
-        if len(body) < 25:  # иногда только заголовок информативен
-            t_only, _ = _extract_text_and_links(title)
-            if len(t_only) > len(body):
-                body = t_only
+        body, inner_links = _item_body(it)
 
         link = it.get("link") or None
         dt = _parse_dt(it.get("published") or it.get("updated") or it.get("pubDate"))
@@ -190,44 +227,170 @@ def _to_llm_schema(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             "список ссылок внутри текста": inner_links,
             "ссылка на саму статью": link,
             "количество повторений": 1,
+            "entities": extractor.extract(body),
         }
-        fp = _fingerprint(body or title)
-        rec["_fp"] = fp
+        rec["_fp"] = _fingerprint(body or title)
         tmp.append(rec)
-        freq[fp] = freq.get(fp, 0) + 1
 
     out: List[Dict[str, Any]] = []
     seen_pairs = set()
     for r in tmp:
-        r["количество повторений"] = freq.get(r["_fp"], 1)
-        r.pop("_fp", None)
+        doc_id = entry_key(r.get("ссылка на саму статью"), r.pop("_fp"))
         key = (r.get("ссылка на саму статью"), r.get("текст статьи"))
         if key in seen_pairs:
             continue
         seen_pairs.add(key)
+        r["dedup_group"] = index.assign(doc_id, r["текст статьи"], r["Время выхода"],
+                                        r["источник"], r["ссылка на саму статью"], now).cluster_id
         out.append(r)
+    for r in out:
+        _apply_cluster(r, index.get(r["dedup_group"]))
     return out
 
 
+def _apply_cluster(rec: Dict[str, Any], cluster: Optional[Cluster]) -> None:
+    """Проставляет записи группу, число повторов и моменты появления членов её кластера."""
+    if cluster is None:
+        return
+    rec["dedup_group"] = cluster.cluster_id
+    rec["количество повторений"] = cluster.size
+    rec["arrivals"] = cluster.arrivals()
+
+
 async def build_llm_payload(hours: int = 48, config_path: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Асинхронно дергает run_pipeline (в отдельном потоке),
-    и возвращает список словарей в требуемом формате.
+    Асинхронно ждёт run_pipeline_async в текущем event loop (общий пул соединений
+    переиспользуется между вызовами) и возвращает список словарей в требуемом формате.
 
     Дополнительно: отбрасывает items, у которых HTTP-статус явно не 2xx
     (ищется в ключах status/status_code/http/http_status/code, в т.ч. во вложенных 'response'/'meta'/'result'),
     либо присутствует ok=False / error / exception / traceback.
     """
+    from services.radar_parser.pipeline import run_pipeline_async
 
-    def _runner():
-        from services.radar_parser.pipeline import run_pipeline
-        if config_path:
-            return run_pipeline(config_path=config_path, hours=hours)
-        return run_pipeline(hours=hours)
-
-    res = await asyncio.to_thread(_runner)
+    res = await run_pipeline_async(config_path=config_path, hours=hours)
     items = res.get("items", []) if isinstance(res, dict) else (res or [])
 
     items = [it for it in items if not _has_bad_http(it)]
 
     return _to_llm_schema(items)
+
+
+async def build_llm_payload_incremental(hours: int = 48, store: Optional[ItemStore] = None,
+                                        config_path: Optional[str] = None,
+                                        scheduler: Optional[PollScheduler] = None,
+                                        index: Optional[SqliteClusterIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Инкрементальный вариант build_llm_payload: возвращает только записи, которых нет в ItemStore.
+
+    Уже виденные ссылки (по каноническому URL) отсекаются до очистки текста, поэтому
+    BeautifulSoup и скоринг работают только по новым статьям. Новые записи добавляются
+    в индекс кластеров всего окна: dedup_group — кластер почти-дубликатов, «количество
+    повторений» — его размер с учётом прошлых циклов.
+    Источники опрашиваются по адаптивному расписанию (PollScheduler): записи неопрошенных
+    источников уже лежат в окне, так что пропуск цикла ничего не теряет.
+    """
+    from services.radar_parser.pipeline import run_pipeline_async
+    from services.radar_parser.item_store import entry_key
+
+    store = store if store is not None else default_item_store()
+    scheduler = scheduler if scheduler is not None else default_poll_scheduler()
+    index = index if index is not None else default_cluster_index(store)
+    res = await run_pipeline_async(config_path=config_path, hours=hours, scheduler=scheduler)
+    items = res.get("items", []) if isinstance(res, dict) else (res or [])
+
+    # ключ считается до очистки/сущностей/кластеризации: записи без ссылки тоже отсекаются по отпечатку
+    fresh = [it for it in items if not _has_bad_http(it) and not store.is_seen(_item_key(it))]
+
+    added: Dict[str, Dict[str, Any]] = {}
+    for rec in _to_llm_schema(fresh, index):
+        key = entry_key(rec.get("ссылка на саму статью"), _fingerprint(rec["текст статьи"]))
+        if key in added or store.is_seen(key):
+            continue
+        added[key] = rec
+
+    store.upsert_many(added.items())
+    await _export_items(fresh)
+    store.evict()
+    index.evict()
+    for rec in added.values():
+        _apply_cluster(rec, index.get(rec["dedup_group"]))
+    store.save()
+    index.save()
+    return list(added.values())
+
+
+async def _export_items(items: List[Dict[str, Any]]) -> None:
+    """Дописывает сырые записи цикла в колоночный экспорт (RADAR_EXPORT_DIR), если он настроен."""
+    from radar_parser.app.export.columnar import default_sink
+
+    sink = default_sink("items")
+    if sink is not None and items:
+        now = time.time()
+        await sink.append_async([{**it, "collected_at": now} for it in items])
+
+
+def warm_records(store: Optional[ItemStore] = None, hours: Optional[float] = None,
+                 now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Записи последних hours часов из ItemStore (все — если hours не задан) с группами и повторами
+    по текущему индексу кластеров — для тёплого старта без обхода лент.
+    Индекс вытесняет документы по первому появлению, а ItemStore — по последнему: записи, которые
+    ещё держатся в лентах, но из индекса уже ушли, распределяются по кластерам заново.
+    """
+    store = store if store is not None else default_item_store()
+    index = default_cluster_index(store)
+    since = (now or time.time()) - hours * 3600.0 if hours is not None else None
+    out = []
+    reassigned = False
+    for key, first_seen, rec in store.records(since=since):
+        cluster = index.cluster_of(key)
+        if cluster is None:
+            cluster = index.assign(key, rec.get("текст статьи", ""), rec.get("Время выхода"),
+                                   rec.get("источник"), rec.get("ссылка на саму статью"), first_seen)
+            reassigned = True
+        _apply_cluster(rec, cluster)
+        out.append(rec)
+    if reassigned:
+        index.save()
+    return out
+
+
+_ITEM_STORE: Optional[ItemStore] = None
+
+
+def default_item_store() -> ItemStore:
+    global _ITEM_STORE
+    if _ITEM_STORE is None:
+        from services.radar_parser.item_store import ItemStore
+        _ITEM_STORE = ItemStore()
+    return _ITEM_STORE
+
+
+_POLL_SCHEDULER: Optional[PollScheduler] = None
+
+
+def default_poll_scheduler() -> PollScheduler:
+    global _POLL_SCHEDULER
+    if _POLL_SCHEDULER is None:
+        from radar_parser.app.schedule.poll_scheduler import PollScheduler
+        _POLL_SCHEDULER = PollScheduler()
+    return _POLL_SCHEDULER
+
+
+_CLUSTER_INDEX: Optional[SqliteClusterIndex] = None
+
+
+def default_cluster_index(store: Optional[ItemStore] = None) -> SqliteClusterIndex:
+    """Персистентный индекс кластеров окна; если он пуст, а ItemStore нет — заполняется из его записей."""
+    global _CLUSTER_INDEX
+    if _CLUSTER_INDEX is None:
+        from radar_parser.app.dedup.cluster_store import SqliteClusterIndex
+        store = store if store is not None else default_item_store()
+        _CLUSTER_INDEX = SqliteClusterIndex()
+        if not len(_CLUSTER_INDEX):
+            for key, first_seen, rec in store.records():
+                _CLUSTER_INDEX.assign(key, rec.get("текст статьи", ""), rec.get("Время выхода"),
+                                      rec.get("источник"), rec.get("ссылка на саму статью"), first_seen)
+            _CLUSTER_INDEX.save()
+    return _CLUSTER_INDEX
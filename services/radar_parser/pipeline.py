@@ -1,44 +1,123 @@
 from __future__ import annotations
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import os, sys
-from typing import Optional, Dict, Any, List
+import warnings
+from urllib.parse import urlparse
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 
 from radar_parser.app.config import load_sources
-from radar_parser.app.fetch.rss_direct import fetch_rss
-from radar_parser.app.fetch.html_fetcher import fetch_html
-from radar_parser.app.parsers.atom_parser import parse_atom
-from radar_parser.app.parsers.site_parsers import parse_html as parse_html_doc
+from radar_parser.app.dedup.dedup import Deduper, _canonical_url
+from radar_parser.app.fetch.rss_direct import fetch_rss_response
+from radar_parser.app.fetch.html_fetcher import fetch_html_response
+from radar_parser.app.fetch.http_client import HttpError, close_session
+from radar_parser.app.fetch.raw_archive import FETCH_SOURCE
+from radar_parser.app.fetch.validator_cache import ValidatorCache, conditional_headers
+from radar_parser.app.fetch.rate_limiter import LIMITER, parse_rate_limit
+from radar_parser.app.parsers.parse_pool import parse_feed, parse_page, shutdown as shutdown_parse_pool
 from radar_parser.app.parsers.listing_fetch import fetch_listing_and_articles
+from radar_parser.app.filter.time_filter import is_recent
+from radar_parser.app.schedule.poll_scheduler import PollScheduler
 
 SOURCE_TYPES = {"rss", "bridge", "html", "html_listing"}
+FALLBACK_STATUSES = {401, 403, 404, 429}
+# 0 — без дедлайна цикла / без хеджирования
+CYCLE_DEADLINE_S = float(os.getenv("RADAR_CYCLE_DEADLINE", "30"))
+HEDGE_AFTER_S = float(os.getenv("RADAR_HEDGE_AFTER", "0"))
 
 
-def _handle_rss(src) -> List[Dict[str, Any]]:
-    verify = (str(src.get("verify_ssl")).lower() != "false")
+VALIDATORS = ValidatorCache()
+
+
+def _cacheable(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # сырая страница в кеше валидаторов не нужна: на 304 отдаются уже распарсенные поля
+    return [{k: v for k, v in it.items() if k != "raw_html"} for it in items]
+
+
+async def _fetch_parsed(url: str, fetcher, parse, verify: bool) -> List[Dict[str, Any]]:
+    """Условный GET: на 304 возвращает ранее распарсенные items без скачивания и парсинга."""
+    entry = VALIDATORS.get(url)
+    resp = await fetcher(url, verify=verify, headers=conditional_headers(entry))
+    if resp.status == 304 and entry is not None:
+        return entry["items"]
+    items = await parse(resp)
+    VALIDATORS.put(url, resp.headers, _cacheable(items))
+    return items
+
+
+def _fallback_url(src) -> Optional[str]:
+    # в sources.csv пустой fallback_url записан как "nan"/"None", а иногда туда съезжают теги
+    url = (src.get("fallback_url") or "").strip()
+    return url if url.lower().startswith(("http://", "https://")) else None
+
+
+async def _race_fallback(fetch_one, primary: str, fallback: str, hedge_after: float) -> List[Dict[str, Any]]:
+    """
+    Основной URL с резервом. Если основной не ответил за hedge_after секунд, параллельно
+    запускается резервный и побеждает первый успешный ответ. Без хеджирования (или если
+    основной упал раньше порога) резерв пробуется только на 401/403/404/429.
+    """
+    main = asyncio.ensure_future(fetch_one(primary))
+    backup: Optional[asyncio.Future] = None
     try:
-        xml = fetch_rss(src["url"], verify=verify)
-        return parse_atom(xml, src["name"])
-    except Exception as e:
-        msg = str(e)
-        if any(code in msg for code in ("401", "403", "404", "429")) and src.get("fallback_url"):
-            xml = fetch_rss(src["fallback_url"], verify=verify)
-            return parse_atom(xml, src["name"])
-        raise
+        if hedge_after > 0:
+            done, _ = await asyncio.wait({main}, timeout=hedge_after)
+            if not done:
+                backup = asyncio.ensure_future(fetch_one(fallback))
+                pending = {main, backup}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for t in done:
+                        if t.exception() is None:
+                            return t.result()
+                # оба упали — наружу отдаём ошибку основного (в ней статус и Retry-After)
+                raise main.exception()
+        try:
+            return await main
+        except HttpError as e:
+            if e.status in FALLBACK_STATUSES:
+                return await fetch_one(fallback)
+            raise
+    finally:
+        for t in (main, backup):
+            if t is not None and not t.done():
+                t.cancel()
 
 
-def _handle_bridge(src) -> List[Dict[str, Any]]:
-    return _handle_rss(src)
+async def _handle_rss(src) -> List[Dict[str, Any]]:
+    verify = (str(src.get("verify_ssl")).lower() != "false")
+    parse = lambda resp: parse_feed(resp.body, src["name"])
+    fetch_one = lambda url: _fetch_parsed(url, fetch_rss_response, parse, verify)
+    fallback = _fallback_url(src)
+    if not fallback:
+        return await fetch_one(src["url"])
+    return await _race_fallback(fetch_one, src["url"], fallback, HEDGE_AFTER_S)
+
+
+async def _handle_bridge(src) -> List[Dict[str, Any]]:
+    return await _handle_rss(src)
 
 
-def _handle_html(src) -> List[Dict[str, Any]]:
+async def _handle_html(src) -> List[Dict[str, Any]]:
     verify = (str(src.get("verify_ssl")).lower() != "false")
-    html = fetch_html(src["url"], verify=verify)
-    return [parse_html_doc(src["url"], html, src["name"])]
+
+    async def parse(resp) -> List[Dict[str, Any]]:
+        return [await parse_page(src["url"], resp.body, src["name"], resp.charset)]
+
+    return await _fetch_parsed(src["url"], fetch_html_response, parse, verify)
 
 
-def _handle_html_listing(src) -> List[Dict[str, Any]]:
-    items = fetch_listing_and_articles(src["url"], src["name"], limit=int(src.get("limit") or 20))
+async def _handle_html_listing(src) -> List[Dict[str, Any]]:
+    url = src["url"]
+    entry = VALIDATORS.get(url)
+    resp = await fetch_html_response(url, headers=conditional_headers(entry), kind="html_listing")
+    if resp.status == 304 and entry is not None:
+        return entry["items"]
+    known = {_canonical_url(it["link"]): it for it in (entry or {}).get("items", []) if it.get("link")}
+    items = await fetch_listing_and_articles(url, src["name"], limit=int(src.get("limit") or 20),
+                                             listing=resp, known=known)
+    VALIDATORS.put(url, resp.headers, _cacheable(items), keep_items=True)
     return items
 
 
@@ -50,7 +129,17 @@ HANDLERS = {
 }
 
 
-def run_pipeline(config_path: Optional[str] = None, hours: int = 48, max_workers: int = 8) -> Dict[str, Any]:
+def _configure_rate_limit(src) -> None:
+    limit = parse_rate_limit(src.get("rate_limit"))
+    if limit is None:
+        return
+    for url in (src.get("url"), _fallback_url(src)):
+        host = urlparse(url or "").hostname
+        if host:
+            LIMITER.configure(host, *limit)
+
+
+def _resolve_sources_path(config_path: Optional[str]) -> str:
     cfg = config_path or os.getenv("RADAR_SOURCES")
 
     if not cfg:
@@ -77,57 +166,168 @@ def run_pipeline(config_path: Optional[str] = None, hours: int = 48, max_workers
             "Передай config_path явно или установи RADAR_SOURCES.\n"
             "Ожидалось, например: services/radar_parser/config/sources.csv"
         )
+    return cfg
+
+
+class PipelineRun:
+    """
+    Один цикл сбора в потоковом режиме: stream() отдаёт items по мере завершения источников
+    (в порядке готовности, а не подачи), применяя на лету лимит на источник, фильтр по
+    времени и дедуп. Статистика (per_source, errors, by_source) копится в объекте и доступна
+    через summary() после окончания потока.
 
-    sources = load_sources(cfg)
-    used_sources = [s for s in sources if (s.get("type") or "").strip().lower() in SOURCE_TYPES]
-
-    per_source: Dict[str, Dict[str, Any]] = {s["name"]: {"type": (s.get("type") or "").strip().lower(),
-                                                         "url": s.get("url"),
-                                                         "ok": 0, "errors": []}
-                                             for s in used_sources}
-
-    all_parsed: List[Dict[str, Any]] = []
-    errors: List[Dict[str, Any]] = []
-
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        future_map = {ex.submit(HANDLERS[(s.get("type") or '').strip().lower()], s): s for s in used_sources}
-        for fut, s in list(future_map.items()):
-            try:
-                items = fut.result()
-                if items:
-                    all_parsed.extend(items)
-                    per_source[s["name"]]["ok"] += len(items)
-            except Exception as e:
-                msg = str(e)
-                errors.append(
-                    {"source": s["name"], "type": per_source[s["name"]]["type"], "url": s.get("url"), "error": msg})
-                per_source[s["name"]]["errors"].append(msg)
-
-    max_per_source = int(os.getenv("RADAR_MAX_ITEMS_PER_SOURCE", "50"))
-    if max_per_source > 0:
-        trimmed: List[Dict[str, Any]] = []
-        cap: Dict[str, int] = {}
-        for it in all_parsed:
-            sname = it.get("source") or "unknown"
-            n = cap.get(sname, 0)
-            if n < max_per_source:
-                cap[sname] = n + 1
-                trimmed.append(it)
-        all_parsed = trimmed
-
-    by_source: Dict[str, int] = {}
-    for it in all_parsed:
+    deadline (RADAR_CYCLE_DEADLINE) ограничивает весь цикл: по его истечении поток
+    завершается, а неуспевшие источники помечаются в per_source как timed_out.
+
+    С scheduler опрашиваются только источники, у которых подошёл срок; остальные
+    помечаются в per_source как skipped, а результаты опроса передаются планировщику.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, hours: int = 48,
+                 scheduler: Optional[PollScheduler] = None, deadline: Optional[float] = None):
+        sources = load_sources(_resolve_sources_path(config_path))
+        self.used_sources = [s for s in sources if (s.get("type") or "").strip().lower() in SOURCE_TYPES]
+        for s in self.used_sources:
+            _configure_rate_limit(s)
+        self.scheduler = scheduler
+        self.polled = scheduler.due(self.used_sources) if scheduler is not None else self.used_sources
+        polled_names = {s["name"] for s in self.polled}
+
+        self.per_source: Dict[str, Dict[str, Any]] = {s["name"]: {"type": (s.get("type") or "").strip().lower(),
+                                                                  "url": s.get("url"),
+                                                                  "ok": 0, "errors": [],
+                                                                  "skipped": s["name"] not in polled_names}
+                                                      for s in self.used_sources}
+        self.errors: List[Dict[str, Any]] = []
+        self.by_source: Dict[str, int] = {}
+        self.emitted = 0
+        self.max_per_source = int(os.getenv("RADAR_MAX_ITEMS_PER_SOURCE", "50"))
+        self.cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+        self.deduper = Deduper()
+        self.deadline = CYCLE_DEADLINE_S if deadline is None else deadline
+
+    async def _run_source(self, src) -> Tuple[Dict[str, Any], Any]:
+        # задача источника — свой контекст: архив сырых ответов подпишет все её запросы именем источника
+        FETCH_SOURCE.set(src["name"])
+        try:
+            return src, await HANDLERS[(src.get("type") or '').strip().lower()](src)
+        except Exception as e:
+            return src, e
+
+    def _record(self, s, items) -> List[Dict[str, Any]]:
+        stats = self.per_source[s["name"]]
+        if isinstance(items, BaseException):
+            msg = str(items)
+            self.errors.append({"source": s["name"], "type": stats["type"], "url": s.get("url"), "error": msg})
+            stats["errors"].append(msg)
+            if self.scheduler is not None:
+                self.scheduler.observe(s["name"], error=items, stats=stats)
+            return []
+        items = items or []
+        stats["ok"] += len(items)
+        if self.scheduler is not None:
+            stats["next_poll_in"] = round(self.scheduler.observe(s["name"], items=items, stats=stats), 1)
+        return [it for it in items if self._accept(it)]
+
+    def _accept(self, it: Dict[str, Any]) -> bool:
         sname = it.get("source") or "unknown"
-        by_source[sname] = by_source.get(sname, 0) + 1
-
-    res: Dict[str, Any] = {
-        "collected_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
-        "source_count": len(used_sources),
-        "total_items_raw": sum(p["ok"] for p in per_source.values()),
-        "total_items_after_filter": len(all_parsed),
-        "items": all_parsed,
-        "errors": errors,
-        "per_source": per_source,
-        "by_source": by_source,
-    }
+        n = self.by_source.get(sname, 0)
+        if self.max_per_source > 0 and n >= self.max_per_source:
+            return False
+        if not is_recent(it, self.cutoff) or not self.deduper.accept(it):
+            return False
+        self.by_source[sname] = n + 1
+        self.emitted += 1
+        return True
+
+    def _timed_out(self, s) -> None:
+        stats = self.per_source[s["name"]]
+        msg = f"cycle deadline {self.deadline:g}s exceeded"
+        stats["timed_out"] = True
+        stats["errors"].append(msg)
+        self.errors.append({"source": s["name"], "type": stats["type"], "url": s.get("url"), "error": msg})
+        if self.scheduler is not None:
+            self.scheduler.observe(s["name"], error=TimeoutError(msg), stats=stats)
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        tasks = {asyncio.ensure_future(self._run_source(s)): s for s in self.polled}
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        end = loop.time() + self.deadline if self.deadline > 0 else None
+        try:
+            while pending:
+                timeout = None if end is None else max(0.0, end - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=timeout,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # дедлайн цикла: отдаём то, что успело прийти, опоздавших помечаем
+                    for fut in pending:
+                        self._timed_out(tasks[fut])
+                    break
+                for fut in done:
+                    s, items = fut.result()
+                    for it in self._record(s, items):
+                        yield it
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+            if self.scheduler is not None:
+                self.scheduler.save()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "collected_at": datetime.utcnow().isoformat() + "Z",
+            "source_count": len(self.used_sources),
+            "polled_count": len(self.polled),
+            "total_items_raw": sum(p["ok"] for p in self.per_source.values()),
+            "total_items_after_filter": self.emitted,
+            "errors": self.errors,
+            "per_source": self.per_source,
+            "by_source": self.by_source,
+        }
+
+
+async def iter_pipeline(config_path: Optional[str] = None, hours: int = 48,
+                        scheduler: Optional[PollScheduler] = None,
+                        deadline: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Потоковый сбор: items по мере готовности источников (см. PipelineRun)."""
+    async for it in PipelineRun(config_path, hours, scheduler, deadline).stream():
+        yield it
+
+
+async def run_pipeline_async(config_path: Optional[str] = None, hours: int = 48,
+                             scheduler: Optional[PollScheduler] = None,
+                             deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Асинхронный сбор по всем источникам через общий пул соединений (см. fetch.http_client).
+    Конкурентность ограничивается RADAR_HTTP_MAX_INFLIGHT и RADAR_HTTP_PER_HOST.
+    Возвращает единый dict с items — поверх потокового PipelineRun.
+    """
+    run = PipelineRun(config_path, hours, scheduler, deadline)
+    items = [it async for it in run.stream()]
+    res = run.summary()
+    res["items"] = items
     return res
+
+
+def run_pipeline(config_path: Optional[str] = None, hours: int = 48,
+                 max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Синхронная обёртка над run_pipeline_async для CLI; закрывает HTTP-сессию и пулы парсинга по завершении.
+
+    max_workers (устарел) — размер прежнего пула потоков; принимается для совместимости и игнорируется,
+    конкурентность задают RADAR_HTTP_MAX_INFLIGHT и RADAR_HTTP_PER_HOST.
+    """
+    if max_workers is not None:
+        warnings.warn("run_pipeline(max_workers=...) устарел и игнорируется: конкурентность задают "
+                      "RADAR_HTTP_MAX_INFLIGHT и RADAR_HTTP_PER_HOST", DeprecationWarning, stacklevel=2)
+
+    async def _main() -> Dict[str, Any]:
+        try:
+            return await run_pipeline_async(config_path=config_path, hours=hours)
+        finally:
+            await close_session()
+            shutdown_parse_pool()
+
+    return asyncio.run(_main())
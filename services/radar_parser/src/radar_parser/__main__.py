@@ -1,5 +1,37 @@
-import sys, json
-from .pipeline import run_pipeline
+import sys, json, asyncio, time
+from services.radar_parser.pipeline import run_pipeline, PipelineRun, close_session, shutdown_parse_pool
+
+
+async def _write_ndjson(cfg: str, hours: int, out: str) -> dict:
+    # NDJSON: по одной записи в строке, сразу по мере готовности источников
+    run = PipelineRun(cfg, hours)
+    f = sys.stdout if out == "-" else open(out, "w", encoding="utf-8")
+    try:
+        async for it in run.stream():
+            f.write(json.dumps(it, ensure_ascii=False) + "\n")
+            f.flush()
+    finally:
+        if f is not sys.stdout:
+            f.close()
+        await close_session()
+        shutdown_parse_pool()
+    return run.summary()
+
+
+async def _write_parquet(cfg: str, hours: int, out: str) -> dict:
+    # Parquet-датасет out/items/date=YYYY-MM-DD/: пишется пачками по мере готовности источников
+    from .app.export.columnar import ColumnarSink
+
+    run = PipelineRun(cfg, hours)
+    sink = ColumnarSink(out, "items", fallback_column="collected_at")
+    try:
+        async for it in run.stream():
+            await sink.append_async([{**it, "collected_at": time.time()}])
+    finally:
+        sink.close()
+        await close_session()
+        shutdown_parse_pool()
+    return run.summary()
 
 
 def _cli(argv=None) -> int:
@@ -9,6 +41,20 @@ def _cli(argv=None) -> int:
     hours = int(argv[1]) if len(argv) >= 2 else 48
     out = argv[2] if len(argv) >= 3 else "output.json"
 
+    if out.endswith(".parquet") or out.endswith("/"):
+        res = asyncio.run(_write_parquet(cfg, hours, out))
+        print(f"Collected: {res['total_items_after_filter']} / raw {res['total_items_raw']}")
+        print("Wrote", out)
+        return 0
+
+    if out == "-" or out.endswith(".ndjson"):
+        res = asyncio.run(_write_ndjson(cfg, hours, out))
+        log = sys.stderr if out == "-" else sys.stdout
+        print(f"Collected: {res['total_items_after_filter']} / raw {res['total_items_raw']}", file=log)
+        if out != "-":
+            print("Wrote", out)
+        return 0
+
     res = run_pipeline(config_path=cfg, hours=hours)
     print(f"Collected: {res['total_items_after_filter']} / raw {res['total_items_raw']}")
     with open(out, "w", encoding="utf-8") as f:
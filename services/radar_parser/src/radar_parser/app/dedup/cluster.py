@@ -0,0 +1,201 @@
+from __future__ import annotations
+import hashlib
+import os
+import random
+import re
+import time as _time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Кластеризация почти-дубликатов: MinHash-подпись по множеству токенов текста и LSH-бакеты
+# по полосам подписи. Кандидаты ищутся только среди документов с совпавшей полосой, поэтому
+# вставка не сравнивает документ со всем окном; кандидаты проверяются оценкой Jaccard.
+NUM_PERM = int(os.getenv("RADAR_CLUSTER_PERM", "96"))
+BANDS = int(os.getenv("RADAR_CLUSTER_BANDS", "32"))
+THRESHOLD = float(os.getenv("RADAR_CLUSTER_THRESHOLD", "0.4"))
+RETAIN_HOURS = float(os.getenv("RADAR_RETAIN_HOURS", "48"))
+TOKEN_PREFIX = 5
+# у коротких текстов (заголовок из пары слов) оценка Jaccard шумная — их склеиваем только при полном совпадении
+MIN_TOKENS = int(os.getenv("RADAR_CLUSTER_MIN_TOKENS", "6"))
+
+_MERSENNE = (1 << 61) - 1
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokens(text: str) -> Set[str]:
+    """
+    Множество признаков текста: слова длиной от 3 символов, обрезанные до TOKEN_PREFIX
+    (грубый стемминг: «ставку», «ставки» → «ставк»), плюс все числа целиком.
+    Пересказ той же новости другим изданием меняет порядок слов, но не этот набор.
+    """
+    out: Set[str] = set()
+    for t in _TOKEN_RE.findall((text or "").lower()):
+        if t.isdigit():
+            out.add(t)
+        elif len(t) >= 3:
+            out.add(t[:TOKEN_PREFIX])
+    return out
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, feats: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(f.encode("utf-8")) for f in feats]
+        if not hashes:
+            return tuple([_MERSENNE] * self.num_perm)
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self.perms)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Оценка Jaccard по доле совпавших позиций MinHash-подписей."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def band_keys(sig: Tuple[int, ...], bands: int = BANDS) -> List[str]:
+    rows = max(1, len(sig) // bands)
+    return [f"{i}:{hash(sig[i * rows:(i + 1) * rows])}" for i in range(bands)]
+
+
+def _ts(iso: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(iso).timestamp() if iso else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Member:
+    doc_id: str
+    time: Optional[str] = None
+    source: Optional[str] = None
+    url: Optional[str] = None
+    arrived_at: float = 0.0
+
+    @property
+    def appeared_at(self) -> float:
+        """Момент появления: время публикации, если оно есть и не позже момента, когда мы статью увидели."""
+        pub = _ts(self.time)
+        return min(pub, self.arrived_at) if pub is not None else self.arrived_at
+
+
+@dataclass
+class Cluster:
+    cluster_id: str
+    members: Dict[str, Member] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+    @property
+    def first_seen(self) -> float:
+        return min((m.appeared_at for m in self.members.values()), default=0.0)
+
+    def arrivals(self) -> List[float]:
+        """Моменты появления членов кластера (epoch, по возрастанию) — основа velocity."""
+        return sorted(m.appeared_at for m in self.members.values())
+
+    def timeline(self) -> List[Dict[str, Optional[str]]]:
+        """Члены кластера по времени выхода: первое сообщение → перепечатки/подтверждения."""
+        ms = sorted(self.members.values(), key=lambda m: (m.time is None, m.time or ""))
+        return [{"time": m.time, "source": m.source, "url": m.url} for m in ms]
+
+
+class ClusterIndex:
+    """
+    Индекс кластеров в памяти: doc_id → подпись и кластер, LSH-бакет → doc_id.
+
+    assign() идемпотентна по doc_id. Документ присоединяется к кластеру наиболее похожего
+    кандидата, если оценка Jaccard ≥ threshold, иначе открывает новый кластер.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self.sigs: Dict[str, Tuple[int, ...]] = {}
+        self.doc_cluster: Dict[str, str] = {}
+        self.clusters: Dict[str, Cluster] = {}
+        self.buckets: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.sigs)
+
+    def _best_match(self, sig: Tuple[int, ...], keys: List[str]) -> Tuple[Optional[str], float]:
+        candidates: Set[str] = set()
+        for key in keys:
+            candidates |= self.buckets.get(key, set())
+        best, best_sim = None, 0.0
+        for cand in candidates:
+            sim = similarity(sig, self.sigs[cand])
+            if sim > best_sim:
+                best, best_sim = cand, sim
+        return best, best_sim
+
+    def assign(self, doc_id: str, text: str, published: Optional[str] = None,
+               source: Optional[str] = None, url: Optional[str] = None,
+               arrived_at: Optional[float] = None) -> Cluster:
+        cid = self.doc_cluster.get(doc_id)
+        if cid is not None:
+            return self.clusters[cid]
+        feats = tokens(text)
+        sig = self.hasher.signature(feats)
+        keys = band_keys(sig, self.bands)
+        best, best_sim = self._best_match(sig, keys)
+        threshold = self.threshold if len(feats) >= MIN_TOKENS else 1.0
+        if best is not None and best_sim >= threshold:
+            cid = self.doc_cluster[best]
+        else:
+            cid = "cl:" + hashlib.sha1(doc_id.encode("utf-8")).hexdigest()[:16]
+            self.clusters[cid] = Cluster(cid)
+        cluster = self.clusters[cid]
+        cluster.members[doc_id] = Member(doc_id, published, source, url, arrived_at or _time.time())
+        self.sigs[doc_id] = sig
+        self.doc_cluster[doc_id] = cid
+        for key in keys:
+            self.buckets.setdefault(key, set()).add(doc_id)
+        return cluster
+
+    def get(self, cluster_id: str) -> Optional[Cluster]:
+        return self.clusters.get(cluster_id)
+
+    def cluster_of(self, doc_id: str) -> Optional[Cluster]:
+        cid = self.doc_cluster.get(doc_id)
+        return self.clusters.get(cid) if cid else None
+
+    def remove(self, doc_id: str) -> None:
+        sig = self.sigs.pop(doc_id, None)
+        if sig is None:
+            return
+        for key in band_keys(sig, self.bands):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[key]
+        cid = self.doc_cluster.pop(doc_id)
+        cluster = self.clusters.get(cid)
+        if cluster is not None:
+            cluster.members.pop(doc_id, None)
+            if not cluster.members:
+                del self.clusters[cid]
+
+    def evict(self, now: Optional[float] = None, retain_hours: float = RETAIN_HOURS) -> int:
+        """Удаляет документы, появившиеся раньше окна retain_hours."""
+        cutoff = (now or _time.time()) - retain_hours * 3600.0
+        stale = [d for d, cid in self.doc_cluster.items()
+                 if self.clusters[cid].members[d].arrived_at < cutoff]
+        for d in stale:
+            self.remove(d)
+        return len(stale)
+
+    def save(self) -> None:
+        pass
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .cluster import BANDS, MIN_TOKENS, NUM_PERM, RETAIN_HOURS, THRESHOLD, \
+    Cluster, Member, MinHasher, band_keys, similarity, tokens
+
+CACHE_DIR = os.getenv("RADAR_CACHE_DIR", ".radar_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_id TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL,
+    size       INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id     TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL,
+    published  TEXT,
+    source     TEXT,
+    url        TEXT,
+    arrived_at REAL NOT NULL,
+    sig        BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_cluster ON docs(cluster_id);
+CREATE INDEX IF NOT EXISTS docs_arrived ON docs(arrived_at);
+CREATE TABLE IF NOT EXISTS bands (
+    band_key TEXT NOT NULL,
+    doc_id   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_key ON bands(band_key);
+CREATE INDEX IF NOT EXISTS bands_doc ON bands(doc_id);
+"""
+
+
+class SqliteClusterIndex:
+    """
+    Персистентный индекс кластеров (RADAR_CACHE_DIR/clusters.sqlite) с тем же интерфейсом, что ClusterIndex.
+
+    Хранит подписи документов, LSH-полосы, состав кластеров, время появления каждого члена
+    и момент, когда мы его увидели, поэтому кластер и его таймлайн переживают перезапуск,
+    а новый документ ищет кандидатов индексированным запросом по полосам, без пересчёта окна.
+    Изменения копятся в транзакции и фиксируются в save().
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = THRESHOLD,
+                 num_perm: int = NUM_PERM, bands: int = BANDS):
+        self.path = Path(path or Path(CACHE_DIR) / "clusters.sqlite")
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    @staticmethod
+    def _pack(sig: Tuple[int, ...]) -> bytes:
+        return array("Q", sig).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Tuple[int, ...]:
+        a = array("Q")
+        a.frombytes(blob)
+        return tuple(a)
+
+    def _best_match(self, sig: Tuple[int, ...], keys: List[str]) -> Tuple[Optional[str], float]:
+        marks = ",".join("?" * len(keys))
+        rows = self.db.execute(
+            f"SELECT DISTINCT d.cluster_id, d.sig FROM bands b JOIN docs d ON d.doc_id = b.doc_id "
+            f"WHERE b.band_key IN ({marks})", keys).fetchall()
+        best, best_sim = None, 0.0
+        for cid, blob in rows:
+            sim = similarity(sig, self._unpack(blob))
+            if sim > best_sim:
+                best, best_sim = cid, sim
+        return best, best_sim
+
+    def assign(self, doc_id: str, text: str, published: Optional[str] = None,
+               source: Optional[str] = None, url: Optional[str] = None,
+               arrived_at: Optional[float] = None) -> Cluster:
+        row = self.db.execute("SELECT cluster_id FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is not None:
+            return self.get(row[0])
+        feats = tokens(text)
+        sig = self.hasher.signature(feats)
+        keys = band_keys(sig, self.bands)
+        cid, best_sim = self._best_match(sig, keys)
+        threshold = self.threshold if len(feats) >= MIN_TOKENS else 1.0
+        member = Member(doc_id, published, source, url, arrived_at or time.time())
+        if cid is None or best_sim < threshold:
+            cid = "cl:" + hashlib.sha1(doc_id.encode("utf-8")).hexdigest()[:16]
+        self.db.execute(
+            "INSERT INTO clusters(cluster_id, first_seen, last_seen, size) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT(cluster_id) DO UPDATE SET first_seen = MIN(first_seen, excluded.first_seen), "
+            "last_seen = MAX(last_seen, excluded.last_seen), size = size + 1",
+            (cid, member.appeared_at, member.arrived_at))
+        self.db.execute(
+            "INSERT INTO docs(doc_id, cluster_id, published, source, url, arrived_at, sig) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, cid, published, source, url, member.arrived_at, self._pack(sig)))
+        self.db.executemany("INSERT INTO bands(band_key, doc_id) VALUES (?, ?)", [(k, doc_id) for k in keys])
+        return self.get(cid)
+
+    def get(self, cluster_id: str) -> Optional[Cluster]:
+        rows = self.db.execute(
+            "SELECT doc_id, published, source, url, arrived_at FROM docs WHERE cluster_id = ?",
+            (cluster_id,)).fetchall()
+        if not rows:
+            return None
+        cluster = Cluster(cluster_id)
+        for doc_id, published, source, url, arrived_at in rows:
+            cluster.members[doc_id] = Member(doc_id, published, source, url, arrived_at)
+        return cluster
+
+    def cluster_of(self, doc_id: str) -> Optional[Cluster]:
+        row = self.db.execute("SELECT cluster_id FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def _delete(self, doc_ids: Iterable[str]) -> int:
+        n = 0
+        for doc_id in doc_ids:
+            row = self.db.execute("SELECT cluster_id FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                continue
+            self.db.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            self.db.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+            self.db.execute("UPDATE clusters SET size = size - 1 WHERE cluster_id = ?", (row[0],))
+            n += 1
+        self.db.execute("DELETE FROM clusters WHERE size <= 0")
+        return n
+
+    def remove(self, doc_id: str) -> None:
+        self._delete([doc_id])
+
+    def evict(self, now: Optional[float] = None, retain_hours: float = RETAIN_HOURS) -> int:
+        """Удаляет документы, появившиеся раньше окна retain_hours (по индексу arrived_at)."""
+        cutoff = (now or time.time()) - retain_hours * 3600.0
+        stale = [r[0] for r in self.db.execute("SELECT doc_id FROM docs WHERE arrived_at < ?", (cutoff,))]
+        return self._delete(stale)
+
+    def save(self) -> None:
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
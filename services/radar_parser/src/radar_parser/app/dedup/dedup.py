@@ -11,15 +11,21 @@ def _canonical_url(u: str) -> str:
     path = sp.path.rstrip("/") or "/"
     return urlunsplit((scheme, sp.netloc.lower(), path, urlencode(q, doseq=True), ""))
 
-def dedup(items: List[Dict]) -> List[Dict]:
-    seen = set()
-    out: List[Dict] = []
-    for it in items:
+class Deduper:
+    """Потоковый вариант dedup: помнит только ключи, items можно отдавать дальше по мере поступления."""
+
+    def __init__(self):
+        self.seen = set()
+
+    def accept(self, it: Dict) -> bool:
         url = _canonical_url(it.get("link") or it.get("url") or "")
         title = (it.get("title") or "").strip().lower()
         key = (url, title)
-        if key in seen:
-            continue
-        seen.add(key)
-        out.append(it)
-    return out
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+def dedup(items: List[Dict]) -> List[Dict]:
+    d = Deduper()
+    return [it for it in items if d.accept(it)]
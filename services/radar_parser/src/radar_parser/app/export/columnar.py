@@ -0,0 +1,221 @@
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # экспорт опционален: pip install radar_parser[export]
+    pa = None
+
+log = logging.getLogger(__name__)
+
+# Корень экспорта; пусто — экспорт выключен
+EXPORT_DIR = os.getenv("RADAR_EXPORT_DIR", "")
+EXPORT_BATCH = int(os.getenv("RADAR_EXPORT_BATCH", "5000"))
+ROW_GROUP_ROWS = int(os.getenv("RADAR_EXPORT_ROW_GROUP", "65536"))
+COMPRESSION = os.getenv("RADAR_EXPORT_COMPRESSION", "zstd")
+# неполный буфер сбрасывается, если пролежал дольше этого (сек): меньше мелких файлов, но и потерь при падении
+FLUSH_INTERVAL_S = float(os.getenv("RADAR_EXPORT_FLUSH", "300"))
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Колоночный экспорт требует pyarrow: pip install pyarrow")
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    ts = pa.timestamp("us", tz="UTC")
+    return {
+        # сырые записи пайплайна, как их отдают парсеры
+        "items": pa.schema([
+            ("published", ts), ("collected_at", ts), ("source", pa.string()),
+            ("title", pa.string()), ("link", pa.string()), ("summary", pa.string()),
+        ]),
+        # вектор фич события: снимок при оценке (rank = null) и строки отданного топа (rank = 1..k)
+        "scores": pa.schema([
+            ("published", ts), ("scored_at", ts), ("source", pa.string()), ("url", pa.string()),
+            ("dedup_group", pa.string()), ("tickers", pa.list_(pa.string())), ("rank", pa.int32()),
+            ("hotness", pa.float64()), ("financial", pa.float64()), ("recency", pa.float64()),
+            ("velocity", pa.float64()), ("confirmations", pa.float64()), ("source_rep", pa.float64()),
+            ("entities", pa.float64()), ("repeats", pa.int32()),
+        ]),
+    }
+
+
+def _to_dt(v: Any) -> Optional[datetime]:
+    if v is None or isinstance(v, datetime):
+        return v
+    if isinstance(v, (int, float)):
+        return datetime.fromtimestamp(v, tz=timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class ColumnarSink:
+    """
+    Потоковая запись строк в партиционированный Parquet: <root>/<dataset>/date=YYYY-MM-DD/part-*.parquet.
+
+    Строки копятся в буфере и сбрасываются пачкой по batch_rows или по flush_interval: каждая пачка —
+    новый неизменяемый файл, поэтому дописывать можно из нескольких процессов без блокировок.
+    Партиция — дата time_column (UTC), а без неё — дата fallback_column. Внутри файла строки
+    отсортированы по (source, time_column), так что статистики row group'ов отсекают чтение
+    по источнику и времени (см. read_dataset).
+    """
+
+    def __init__(self, root: str, dataset: str, time_column: str = "published",
+                 fallback_column: Optional[str] = None, batch_rows: int = EXPORT_BATCH,
+                 flush_interval: float = FLUSH_INTERVAL_S):
+        _require_pyarrow()
+        self.schema = _schemas()[dataset]
+        self.path = Path(root) / dataset
+        self.time_column = time_column
+        self.fallback_column = fallback_column
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._buf_since = 0.0
+        self._time_columns = [f.name for f in self.schema if pa.types.is_timestamp(f.type)]
+        self._buf: List[Dict[str, Any]] = []
+
+    def _add(self, rows: Iterable[Dict[str, Any]]) -> bool:
+        """Кладёт строки в буфер; True — пора сбрасывать (buf >= batch_rows или истёк flush_interval)."""
+        if not self._buf:
+            self._buf_since = time.monotonic()
+        for row in rows:
+            row = {name: row.get(name) for name in self.schema.names}
+            for name in self._time_columns:
+                row[name] = _to_dt(row[name])
+            self._buf.append(row)
+        return len(self._buf) >= self.batch_rows or \
+            (bool(self._buf) and time.monotonic() - self._buf_since >= self.flush_interval)
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> None:
+        if self._add(rows):
+            self.flush()
+
+    async def append_async(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """append для event loop: буфер пополняется сразу, а запись Parquet идёт в пуле потоков."""
+        if self._add(rows):
+            batch, self._buf = self._buf, []
+            await asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+
+    def _partition(self, row: Dict[str, Any]) -> str:
+        dt = row[self.time_column] or (row[self.fallback_column] if self.fallback_column else None)
+        return (dt or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+    def flush(self) -> int:
+        """Пишет буфер в файлы партиций; возвращает число записанных строк."""
+        rows, self._buf = self._buf, []
+        return self._write(rows)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        parts: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            parts.setdefault(self._partition(row), []).append(row)
+        for day, part_rows in parts.items():
+            table = pa.Table.from_pylist(part_rows, schema=self.schema)
+            table = table.sort_by([("source", "ascending"), (self.time_column, "ascending")])
+            out_dir = self.path / f"date={day}"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp = out_dir / ("." + name)
+            pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS, compression=COMPRESSION)
+            os.replace(tmp, out_dir / name)  # читатели не видят недописанный файл
+        return len(rows)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def read_dataset(root: str, dataset: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 sources: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None,
+                 time_column: str = "published", partition_column: str = "published") -> "pa.Table":
+    """
+    Читает срез датасета [start, end) по time_column и списку источников.
+
+    Фильтр по времени/источнику уходит в row group'ы Parquet; партиции по дате отсекаются
+    целиком, только если time_column — тот столбец, по которому писались партиции
+    (partition_column, у ColumnarSink это published). Файлы читаются через memory map.
+    """
+    _require_pyarrow()
+    data = ds.dataset(str(Path(root) / dataset), format="parquet",
+                      partitioning=ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive"),
+                      schema=_schemas()[dataset].append(pa.field("date", pa.string())),
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+    prune = time_column == partition_column
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if start is not None:
+        start = _to_dt(start)
+        expr = _and(pc.field(time_column) >= pa.scalar(start, pa.timestamp("us", tz="UTC")))
+        if prune:
+            expr = _and(pc.field("date") >= start.astimezone(timezone.utc).strftime("%Y-%m-%d"))
+    if end is not None:
+        end = _to_dt(end)
+        expr = _and(pc.field(time_column) < pa.scalar(end, pa.timestamp("us", tz="UTC")))
+        if prune:
+            expr = _and(pc.field("date") <= end.astimezone(timezone.utc).strftime("%Y-%m-%d"))
+    if sources:
+        expr = _and(pc.field("source").isin(list(sources)))
+    return data.to_table(columns=list(columns) if columns else None, filter=expr)
+
+
+_SINKS: Dict[str, ColumnarSink] = {}
+_DISABLED = False
+
+
+def _disable(e: Exception) -> None:
+    global _DISABLED
+    _DISABLED = True
+    _SINKS.clear()
+    log.warning("Колоночный экспорт в %s выключен: %s", EXPORT_DIR, e)
+
+
+def init_export() -> bool:
+    """
+    Проверяет экспорт один раз при старте: без pyarrow или с недоступным для записи RADAR_EXPORT_DIR
+    экспорт выключается с предупреждением в лог, и default_sink дальше возвращает None.
+    """
+    if not EXPORT_DIR or _DISABLED:
+        return False
+    try:
+        Path(EXPORT_DIR).mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        _disable(e)
+        return False
+    return all(default_sink(dataset) is not None for dataset in ("items", "scores"))
+
+
+def default_sink(dataset: str) -> Optional[ColumnarSink]:
+    """Sink датасета в RADAR_EXPORT_DIR или None, если экспорт не настроен или выключен (см. init_export)."""
+    if not EXPORT_DIR or _DISABLED:
+        return None
+    sink = _SINKS.get(dataset)
+    if sink is None:
+        fallback = {"items": "collected_at", "scores": "scored_at"}[dataset]
+        try:
+            sink = _SINKS[dataset] = ColumnarSink(EXPORT_DIR, dataset, fallback_column=fallback)
+        except ImportError as e:
+            _disable(e)
+            return None
+    return sink
+
+
+def flush_all() -> None:
+    for sink in _SINKS.values():
+        sink.flush()
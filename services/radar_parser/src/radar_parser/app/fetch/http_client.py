@@ -0,0 +1,155 @@
+from __future__ import annotations
+import asyncio
+import codecs
+import os
+import re
+import ssl
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .raw_archive import FETCH_SOURCE, default_archive
+from .rate_limiter import LIMITER
+
+# Общий асинхронный HTTP-слой для всех фетчеров: одна сессия с пулом keep-alive соединений,
+# глобальный лимит одновременных запросов, отдельный лимит на каждый хост и per-host rate limit.
+MAX_INFLIGHT = int(os.getenv("RADAR_HTTP_MAX_INFLIGHT", "64"))
+PER_HOST_LIMIT = int(os.getenv("RADAR_HTTP_PER_HOST", "4"))
+KEEPALIVE_S = float(os.getenv("RADAR_HTTP_KEEPALIVE", "30"))
+# объявление кодировки ищется, как у браузеров, в начале документа: <meta charset>, http-equiv, <?xml encoding?>
+_DECLARED_RE = re.compile(rb"""<(?:meta[^>]+charset|\?xml[^>]+encoding)\s*=\s*["']?([\w.:-]+)""", re.I)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+class HttpError(RuntimeError):
+    """Не-2xx/3xx ответ сервера; хранит статус и заголовки для решений выше по стеку."""
+
+    def __init__(self, url: str, status: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status} for url: {url}")
+        self.url = url
+        self.status = status
+        self.headers = dict(headers or {})
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    body: bytes
+    headers: Dict[str, str]
+    elapsed: float
+    charset: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return decode_body(self.body, self.charset)
+
+
+def decode_body(body: bytes, charset: Optional[str] = None) -> str:
+    """
+    Текст ответа: кодировка из Content-Type, без неё — BOM или объявление в первых 1024 байтах
+    документа (<meta charset>, <?xml encoding?>), иначе utf-8. Без угадывания по содержимому:
+    живой сбор и реплей архива должны декодировать одни и те же байты одинаково.
+    """
+    if not charset:
+        for bom, enc in _BOMS:
+            if body.startswith(bom):
+                charset = enc
+                break
+        else:
+            m = _DECLARED_RE.search(body[:1024])
+            charset = m.group(1).decode("ascii") if m else None
+    try:
+        return body.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _ssl_context() -> ssl.SSLContext:
+    ctx = ssl.create_default_context()
+    try:
+        import certifi
+        ctx.load_verify_locations(certifi.where())
+    except Exception:
+        pass
+    return ctx
+
+
+class _ClientState:
+    """Сессия и семафоры привязаны к event loop, поэтому пересоздаются при смене цикла."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        self.hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def host_slot(self, host: str) -> asyncio.Semaphore:
+        sem = self.hosts.get(host)
+        if sem is None:
+            sem = self.hosts[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+        return sem
+
+
+_STATE: Optional[_ClientState] = None
+
+
+def _state() -> _ClientState:
+    global _STATE
+    loop = asyncio.get_running_loop()
+    if _STATE is None or _STATE.loop is not loop:
+        _STATE = _ClientState(loop)
+    return _STATE
+
+
+def get_session() -> aiohttp.ClientSession:
+    st = _state()
+    if st.session is None or st.session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_INFLIGHT,
+            limit_per_host=PER_HOST_LIMIT,
+            keepalive_timeout=KEEPALIVE_S,
+            ttl_dns_cache=300,
+            ssl=_ssl_context(),
+        )
+        st.session = aiohttp.ClientSession(connector=connector)
+    return st.session
+
+
+async def close_session() -> None:
+    global _STATE
+    st = _STATE
+    _STATE = None
+    if st is not None and st.session is not None and not st.session.closed:
+        await st.session.close()
+
+
+async def fetch(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 25,
+                verify: bool = True, kind: Optional[str] = None) -> FetchResult:
+    """GET через общий пул; kind (rss/html/bridge) — вид запроса для архива сырых ответов (RADAR_RAW_ARCHIVE)."""
+    st = _state()
+    host = (urlparse(url).hostname or "").lower()
+    # токен ждём до захвата семафоров, чтобы ожидание не занимало слоты пула
+    await LIMITER.acquire(host)
+    async with st.inflight, st.host_slot(host):
+        t0 = time.monotonic()
+        async with get_session().get(url, headers=headers, allow_redirects=True,
+                                     timeout=aiohttp.ClientTimeout(total=timeout),
+                                     ssl=True if verify else False) as resp:
+            body = await resp.read()
+            res = FetchResult(url=str(resp.url), status=resp.status, body=body,
+                              headers=dict(resp.headers), elapsed=time.monotonic() - t0,
+                              charset=resp.charset)
+    archive = default_archive()
+    if archive is not None:
+        # сжатие и запись на диск — в потоке, чтобы не держать event loop (контекст в поток не переходит)
+        source = FETCH_SOURCE.get()
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: archive.put(url, res.status, res.body, res.headers, res.elapsed,
+                                      final_url=res.url, kind=kind, source=source))
+    if res.status >= 400:
+        raise HttpError(url, res.status, res.headers)
+    return res
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# По умолчанию ~1 запрос в 0.7 с на хост (как прежний _sleep_if_needed), с небольшим burst.
+DEFAULT_RATE = float(os.getenv("RADAR_HOST_RATE", str(1 / 0.7)))
+DEFAULT_BURST = float(os.getenv("RADAR_HOST_BURST", "2"))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Забирает токен (баланс может уйти в минус) и возвращает, сколько ждать до своего слота."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1.0
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    """
+    Per-host token bucket. Слот резервируется атомарно под локом, а ожидание идёт через
+    asyncio.sleep, так что конкурентные запросы к одному хосту выстраиваются в очередь
+    с заданной частотой, не блокируя воркеры, а запросы к другим хостам идут параллельно.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST):
+        self.default = (rate, burst)
+        self.limits: Dict[str, Tuple[float, float]] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: float, burst: Optional[float] = None) -> None:
+        host = (host or "").lower()
+        limit = (rate, burst if burst is not None else self.default[1])
+        with self._lock:
+            if self.limits.get(host) == limit:
+                return
+            self.limits[host] = limit
+            self.buckets.pop(host, None)
+
+    def _reserve(self, host: str) -> float:
+        with self._lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(*self.limits.get(host, self.default))
+            return bucket.reserve()
+
+    async def acquire(self, host: str) -> None:
+        wait = self._reserve((host or "").lower())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def parse_rate_limit(value: Optional[str]) -> Optional[Tuple[float, Optional[float]]]:
+    """Разбирает колонку rate_limit из sources.csv: "rate" или "rate/burst" (запросов в секунду)."""
+    if not value or str(value).strip().lower() in ("nan", "none"):
+        return None
+    rate_s, _, burst_s = str(value).strip().partition("/")
+    try:
+        rate = float(rate_s)
+        burst = float(burst_s) if burst_s else None
+    except ValueError:
+        return None
+    if rate <= 0:
+        return None
+    return rate, burst
+
+
+LIMITER = HostRateLimiter()
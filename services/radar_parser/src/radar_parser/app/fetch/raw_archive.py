@@ -0,0 +1,156 @@
+from __future__ import annotations
+import contextvars
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # без zstandard тела сжимаются gzip'ом
+    zstandard = None
+
+# Каталог архива сырых ответов; пусто — архив выключен
+RAW_ARCHIVE_DIR = os.getenv("RADAR_RAW_ARCHIVE", "")
+RAW_ARCHIVE_MAX_MB = float(os.getenv("RADAR_RAW_ARCHIVE_MAX_MB", "2048"))
+RAW_ARCHIVE_LEVEL = int(os.getenv("RADAR_RAW_ARCHIVE_LEVEL", "3"))
+# заголовки ответа, которые попадают в метаданные (остальные — шум для разбора и реплея)
+KEEP_HEADERS = ("content-type", "content-encoding", "content-length", "etag", "last-modified",
+                "cache-control", "expires", "date", "age", "retry-after", "x-ratelimit-remaining")
+
+# Источник текущего запроса: пайплайн выставляет его на время обработки источника,
+# чтобы метаданные fetch знали имя источника (нужно реплею для parse_atom/parse_html)
+FETCH_SOURCE: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("radar_fetch_source", default=None)
+
+
+def _compress(body: bytes) -> tuple:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=RAW_ARCHIVE_LEVEL).compress(body), ".zst"
+    return gzip.compress(body, compresslevel=min(max(RAW_ARCHIVE_LEVEL, 1), 9), mtime=0), ".gz"
+
+
+def decompress(data: bytes, suffix: str) -> bytes:
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("Тело сжато zstd: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if suffix == ".gz":
+        return gzip.decompress(data)
+    return data
+
+
+class RawArchive:
+    """
+    Архив сырых ответов: тела — по адресу содержимого, метаданные — JSONL по дням.
+
+    Тело хранится один раз на sha256 (objects/ab/<sha256>.zst, без zstandard — .gz): лента,
+    которая между опросами не изменилась, новых байт не добавляет, только строку метаданных.
+    Строка fetches-YYYY-MM-DD.jsonl: время, URL (запрошенный и итоговый), вид запроса, источник,
+    статус, отобранные заголовки, задержка, размер тела и путь к объекту — это же манифест реплея.
+    Размер архива ограничен max_mb: при превышении удаляются файлы, к которым дольше всего
+    не обращались (mtime объекта обновляется при каждом повторном ответе с тем же телом).
+    """
+
+    def __init__(self, root: str, max_mb: float = RAW_ARCHIVE_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.stats = {"fetches": 0, "objects_written": 0, "dedup_hits": 0, "bytes_in": 0, "bytes_stored": 0,
+                      "evicted": 0}
+
+    def _object(self, sha: str) -> Optional[Path]:
+        base = self.root / "objects" / sha[:2]
+        for suffix in (".zst", ".gz"):
+            p = base / (sha + suffix)
+            if p.exists():
+                return p
+        return None
+
+    def _total_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file())
+        return self._size
+
+    def put(self, url: str, status: int, body: bytes, headers: Dict[str, str], elapsed: float,
+            final_url: Optional[str] = None, kind: Optional[str] = None, source: Optional[str] = None,
+            fetched_at: Optional[float] = None) -> Dict[str, Any]:
+        """Сохраняет ответ; возвращает записанную строку метаданных."""
+        fetched_at = fetched_at or time.time()
+        sha = hashlib.sha256(body).hexdigest() if body else None
+        rec: Dict[str, Any] = {
+            "fetched_at": round(fetched_at, 3), "url": url, "kind": kind, "source": source,
+            "status": status, "latency": round(elapsed, 4), "bytes": len(body), "sha256": sha,
+            "headers": {k.lower(): v for k, v in headers.items() if k.lower() in KEEP_HEADERS},
+        }
+        if final_url and final_url != url:
+            rec["final_url"] = final_url
+        with self._lock:
+            added = 0
+            if sha is not None:
+                obj = self._object(sha)
+                if obj is not None:
+                    os.utime(obj)
+                    self.stats["dedup_hits"] += 1
+                else:
+                    data, suffix = _compress(body)
+                    obj = self.root / "objects" / sha[:2] / (sha + suffix)
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = obj.with_name("." + obj.name)
+                    tmp.write_bytes(data)
+                    os.replace(tmp, obj)
+                    added += len(data)
+                    self.stats["objects_written"] += 1
+                    self.stats["bytes_stored"] += len(data)
+                rec["path"] = str(obj.relative_to(self.root))
+            day = datetime.fromtimestamp(fetched_at, tz=timezone.utc).strftime("%Y-%m-%d")
+            line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.root / f"fetches-{day}.jsonl", "ab") as f:
+                f.write(line)
+            added += len(line)
+            self.stats["fetches"] += 1
+            self.stats["bytes_in"] += len(body)
+            self._size = self._total_size() + added
+            if self._size > self.max_bytes:
+                self._evict(day)
+        return rec
+
+    def _evict(self, today: str) -> None:
+        """Удаляет давно не использованные объекты и старые дни метаданных до 90% лимита."""
+        files = [p for p in self.root.rglob("*")
+                 if p.is_file() and not p.name.startswith(".") and p.name != f"fetches-{today}.jsonl"]
+        files.sort(key=lambda p: p.stat().st_mtime)
+        target = int(self.max_bytes * 0.9)
+        for p in files:
+            if self._size <= target:
+                break
+            size = p.stat().st_size
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            self._size -= size
+            self.stats["evicted"] += 1
+
+    def read(self, rel_path: str) -> bytes:
+        p = self.root / rel_path
+        return decompress(p.read_bytes(), p.suffix)
+
+
+_ARCHIVE: Optional[RawArchive] = None
+
+
+def default_archive() -> Optional[RawArchive]:
+    """Архив в RADAR_RAW_ARCHIVE или None, если он не настроен."""
+    global _ARCHIVE
+    if not RAW_ARCHIVE_DIR:
+        return None
+    if _ARCHIVE is None:
+        _ARCHIVE = RawArchive(RAW_ARCHIVE_DIR)
+    return _ARCHIVE
@@ -1,7 +1,8 @@
-
 from __future__ import annotations
 import os
-import requests
+from typing import Dict
+
+from .http_client import FetchResult, fetch
 
 UA = os.getenv("RADAR_UA", "RadarParser/1.1 (+https://example.org)")
 DEFAULT_HEADERS = {
@@ -9,9 +10,14 @@ DEFAULT_HEADERS = {
     "Accept": "application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8",
 }
 
-def fetch_rss(url: str, timeout: int = 25, verify: bool | None = None) -> str:
+async def fetch_rss_response(url: str, timeout: int = 25, verify: bool | None = None,
+                             headers: Dict[str, str] | None = None) -> FetchResult:
     if verify is None:
         verify = os.getenv("RADAR_VERIFY_SSL", "true").lower() == "true"
-    resp = requests.get(url, timeout=timeout, headers=DEFAULT_HEADERS, allow_redirects=True, verify=verify)
-    resp.raise_for_status()
+    return await fetch(url, headers={**DEFAULT_HEADERS, **(headers or {})}, timeout=timeout, verify=verify,
+                       kind="rss")
+
+
+async def fetch_rss(url: str, timeout: int = 25, verify: bool | None = None) -> str:
+    resp = await fetch_rss_response(url, timeout=timeout, verify=verify)
     return resp.text
@@ -1,10 +1,10 @@
 from __future__ import annotations
-import requests
+
+from .http_client import fetch
 
 UA = "RadarParser/1.0 (+fetch)"
 
 
-def fetch_rssbridge(url: str, timeout: int = 20) -> str:
-    resp = requests.get(url, timeout=timeout, headers={"User-Agent": UA})
-    resp.raise_for_status()
+async def fetch_rssbridge(url: str, timeout: int = 20) -> str:
+    resp = await fetch(url, headers={"User-Agent": UA}, timeout=timeout, kind="bridge")
     return resp.text
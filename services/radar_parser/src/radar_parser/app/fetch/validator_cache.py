@@ -0,0 +1,78 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..dedup.dedup import _canonical_url
+
+# Кэш валидаторов HTTP (ETag / Last-Modified) вместе с уже распарсенными записями.
+# На 304 пайплайн переиспользует items из кэша и не скачивает/не парсит ленту заново.
+CACHE_DIR = os.getenv("RADAR_CACHE_DIR", ".radar_cache")
+
+
+class ValidatorCache:
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or CACHE_DIR) / "http"
+        self._mem: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _key(self, url: str) -> str:
+        return _canonical_url(url)
+
+    def _path(self, key: str) -> Path:
+        return self.root / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key = self._key(url)
+        if key in self._mem:
+            return self._mem[key]
+        entry = None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        self._mem[key] = entry
+        return entry
+
+    def put(self, url: str, headers: Dict[str, str], items: List[Dict[str, Any]],
+            keep_items: bool = False) -> None:
+        # keep_items — сохранить items даже без валидаторов (листинги переиспользуют статьи по ссылке)
+        lower = {k.lower(): v for k, v in (headers or {}).items()}
+        etag = lower.get("etag")
+        last_modified = lower.get("last-modified")
+        key = self._key(url)
+        if not (etag or last_modified or (keep_items and items)):
+            # без валидаторов условный запрос невозможен — хранить нечего
+            self._mem[key] = None
+            return
+        entry = {
+            "url": key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "items": items,
+        }
+        self._mem[key] = entry
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    if not entry:
+        return {}
+    headers: Dict[str, str] = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
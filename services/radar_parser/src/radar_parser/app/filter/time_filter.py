@@ -25,3 +25,13 @@ def filter_last_hours(items: List[Dict[str, Any]], hours: int = 48) -> List[Dict
         except Exception:
             continue
     return out
+
+def is_recent(it: Dict[str, Any], cutoff: datetime) -> bool:
+    """Потоковый фильтр: False только для записей с датой старше cutoff; записи без даты пропускает."""
+    ds = it.get("published")
+    if not ds:
+        return True
+    try:
+        return _to_utc(dateutil.parser.parse(ds)) >= cutoff
+    except Exception:
+        return True
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 
-from ..fetch.html_fetcher import fetch_html
-from .site_parsers import parse_html as parse_article
+from ..dedup.dedup import _canonical_url
+from ..fetch.html_fetcher import fetch_html_response
+from ..fetch.http_client import FetchResult, decode_body
+from .parse_pool import parse_page, run_parse
 
 LINK_RULES = {
     "www.rbc.ru": ["a.news-feed__item", "a.js-news-feed-item"],
@@ -24,8 +27,7 @@ GENERIC_RULES = ["article a[href]", "h2 a[href]", ".news a[href]", ".item a[href
 def _pick_rules(host: str) -> List[str]:
     return LINK_RULES.get(host, GENERIC_RULES)
 
-def fetch_listing_and_articles(listing_url: str, source_name: str, limit: int = 20) -> List[Dict]:
-    html = fetch_html(listing_url)
+def extract_listing_links(listing_url: str, html: str, limit: int = 20) -> List[str]:
     soup = BeautifulSoup(html, "lxml")
 
     host = (urlparse(listing_url).hostname or "").lower()
@@ -49,12 +51,31 @@ def fetch_listing_and_articles(listing_url: str, source_name: str, limit: int =
                 break
         if len(links) >= limit:
             break
+    return links
 
-    out: List[Dict] = []
-    for link in links:
+def _listing_links_job(listing_url: str, body: bytes, charset: Optional[str], limit: int) -> List[str]:
+    return extract_listing_links(listing_url, decode_body(body, charset), limit)
+
+
+async def fetch_listing_and_articles(listing_url: str, source_name: str, limit: int = 20,
+                                     listing: Optional[FetchResult] = None,
+                                     known: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    # listing — уже скачанный ответ листинга (например, после условного GET в пайплайне)
+    # known — статьи прошлых циклов по каноническому URL: их не качаем и не парсим повторно
+    resp = listing if listing is not None else await fetch_html_response(listing_url, kind="html_listing")
+    links = await run_parse(_listing_links_job, listing_url, resp.body, resp.charset, limit, size=len(resp.body))
+    known = known or {}
+
+    async def _article(link: str) -> Optional[Dict]:
+        prev = known.get(_canonical_url(link))
+        if prev is not None:
+            return prev
         try:
-            art_html = fetch_html(link)
-            out.append(parse_article(link, art_html, source_name))
+            # параллелизм по хосту ограничивает rate limiter внутри fetch
+            art = await fetch_html_response(link)
+            return await parse_page(link, art.body, source_name, art.charset)
         except Exception:
-            pass
-    return out
+            return None
+
+    results = await asyncio.gather(*(_article(link) for link in links))
+    return [r for r in results if r is not None]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..fetch.http_client import decode_body
+from .atom_parser import parse_atom
+from .site_parsers import parse_html
+
+# Стадия парсинга: BeautifulSoup/lxml и feedparser — CPU-bound, поэтому крупные документы
+# уходят в пул процессов (масштабируется по ядрам, не упирается в GIL), а мелкие
+# парсятся в потоке текущего процесса — пересылка между процессами им дороже самого парсинга.
+PARSE_WORKERS = int(os.getenv("RADAR_PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_THREADS = int(os.getenv("RADAR_PARSE_THREADS", "4"))
+INPROC_MAX_BYTES = int(os.getenv("RADAR_PARSE_INPROC_BYTES", "32768"))
+
+_THREADS: Optional[ThreadPoolExecutor] = None
+_PROCESSES: Optional[ProcessPoolExecutor] = None
+
+
+def _threads() -> ThreadPoolExecutor:
+    global _THREADS
+    if _THREADS is None:
+        _THREADS = ThreadPoolExecutor(max_workers=PARSE_THREADS, thread_name_prefix="radar-parse")
+    return _THREADS
+
+
+def _processes() -> Optional[ProcessPoolExecutor]:
+    global _PROCESSES
+    if PARSE_WORKERS < 2:
+        return None
+    if _PROCESSES is None:
+        _PROCESSES = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _PROCESSES
+
+
+def _pick(size: int) -> Executor:
+    if size >= INPROC_MAX_BYTES:
+        pool = _processes()
+        if pool is not None:
+            return pool
+    return _threads()
+
+
+async def run_parse(fn: Callable[..., Any], *args: Any, size: int = 0) -> Any:
+    """Выполняет fn(*args) вне event loop; size — объём входа в байтах для выбора пула."""
+    return await asyncio.get_running_loop().run_in_executor(_pick(size), fn, *args)
+
+
+def _parse_page_job(url: str, body: bytes, charset: Optional[str], source_name: str) -> Dict[str, Any]:
+    # страница декодируется уже в воркере: через pickle идут сырые байты (для кириллицы в UTF-8
+    # они вдвое меньше str), обратно raw_html не гоняем
+    item = parse_html(url, decode_body(body, charset), source_name)
+    item.pop("raw_html", None)
+    return item
+
+
+async def parse_feed(body: Union[bytes, str], source_name: str) -> List[Dict[str, Any]]:
+    """RSS/Atom → items; на вход сырые байты, кодировку определяет feedparser."""
+    return await run_parse(parse_atom, body, source_name, size=len(body))
+
+
+async def parse_page(url: str, body: bytes, source_name: str, charset: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Сырые байты HTML-страницы статьи → item (в формате site_parsers.parse_html, без raw_html).
+    Декодирование — decode_body с charset ответа, как FetchResult.text, но вне event loop.
+    """
+    return await run_parse(_parse_page_job, url, body, charset, source_name, size=len(body))
+
+
+def shutdown() -> None:
+    global _THREADS, _PROCESSES
+    for pool in (_THREADS, _PROCESSES):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _THREADS = _PROCESSES = None
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import json
+import os
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..fetch.http_client import HttpError
+from ..parsers.generic_parser import parse_date_safe
+
+CACHE_DIR = os.getenv("RADAR_CACHE_DIR", ".radar_cache")
+MIN_INTERVAL_S = float(os.getenv("RADAR_POLL_MIN_INTERVAL", "60"))
+MAX_INTERVAL_S = float(os.getenv("RADAR_POLL_MAX_INTERVAL", "3600"))
+EWMA_ALPHA = 0.3
+# опрашиваем примерно вдвое чаще наблюдаемого интервала между новыми записями
+POLL_FRACTION = 0.5
+RECENT_LINKS = 300
+
+
+def _retry_after_seconds(headers: Dict[str, str], now: float) -> Optional[float]:
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, dt.timestamp() - now)
+
+
+def _published_ts(items: List[Dict[str, Any]]) -> List[float]:
+    out: List[float] = []
+    for it in items:
+        dt = parse_date_safe(it.get("published"))
+        if dt is None:
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        out.append(dt.timestamp())
+    return sorted(out)
+
+
+class PollScheduler:
+    """
+    Адаптивный опрос источников по наблюдаемой частоте публикаций.
+
+    Для каждого источника хранится EWMA интервала между новыми записями (gap), число
+    подряд идущих ошибок и момент следующего опроса. Быстрые ленты опрашиваются часто,
+    медленные и падающие — с отступом; 429/503 с Retry-After откладывают опрос на указанное время.
+    Состояние и последняя статистика per_source пайплайна сохраняются в RADAR_CACHE_DIR.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 min_interval: float = MIN_INTERVAL_S, max_interval: float = MAX_INTERVAL_S):
+        self.path = Path(path or Path(CACHE_DIR) / "poll_state.json")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.state: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def _st(self, name: str) -> Dict[str, Any]:
+        st = self.state.get(name)
+        if st is None:
+            st = self.state[name] = {
+                "next_due": 0.0, "interval": self.min_interval, "gap_ewma": None,
+                "last_poll": None, "latest_published": None, "failures": 0,
+                "recent_links": [], "stats": {},
+            }
+        return st
+
+    def due(self, sources: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = now or time.time()
+        return [s for s in sources if self._st(s["name"]).get("next_due", 0.0) <= now]
+
+    def observe(self, name: str, items: Optional[List[Dict[str, Any]]] = None,
+                error: Optional[BaseException] = None, stats: Optional[Dict[str, Any]] = None,
+                now: Optional[float] = None) -> float:
+        """Учитывает результат опроса и возвращает интервал до следующего."""
+        now = now or time.time()
+        st = self._st(name)
+        if stats is not None:
+            st["stats"] = stats
+
+        if error is not None:
+            st["failures"] = st.get("failures", 0) + 1
+            interval = min(self.max_interval, max(st.get("interval") or self.min_interval, self.min_interval)
+                           * (2 ** min(st["failures"], 6)))
+            if isinstance(error, HttpError) and error.status in (429, 503):
+                retry = _retry_after_seconds(error.headers, now)
+                if retry is not None:
+                    interval = max(interval if error.status == 503 else self.min_interval, retry)
+            st["next_due"] = now + interval
+            st["last_poll"] = now
+            return interval
+
+        items = items or []
+        st["failures"] = 0
+        published = _published_ts(items)
+        latest = st.get("latest_published")
+        recent = set(st.get("recent_links") or [])
+        if published:
+            new_count = sum(1 for ts in published if latest is None or ts > latest)
+        else:
+            new_count = sum(1 for it in items if it.get("link") and it["link"] not in recent)
+
+        last_poll = st.get("last_poll")
+        gap = st.get("gap_ewma")
+        sample: Optional[float] = None
+        if last_poll is None:
+            # холодный старт: оцениваем по разбросу дат публикации в текущей выдаче
+            if len(published) >= 2:
+                sample = (published[-1] - published[0]) / (len(published) - 1)
+        elif new_count > 0:
+            sample = (now - last_poll) / new_count
+        elif gap is None or now - last_poll > gap:
+            sample = now - last_poll
+        if sample is not None:
+            sample = max(1.0, sample)
+            gap = sample if gap is None else (1 - EWMA_ALPHA) * gap + EWMA_ALPHA * sample
+
+        interval = self.min_interval if gap is None else gap * POLL_FRACTION
+        interval = max(self.min_interval, min(self.max_interval, interval))
+
+        st["gap_ewma"] = gap
+        st["interval"] = interval
+        st["last_poll"] = now
+        st["next_due"] = now + interval
+        if published:
+            st["latest_published"] = max(published[-1], latest or 0.0)
+        links = [it["link"] for it in items if it.get("link")]
+        st["recent_links"] = links[:RECENT_LINKS]
+        return interval
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import csv
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .trie import trie_regex
+
+# Словарь инструментов: services/radar_parser/config/instruments.csv или RADAR_INSTRUMENTS
+INSTRUMENTS_PATH = os.getenv("RADAR_INSTRUMENTS") or str(
+    Path(__file__).resolve().parents[4] / "config" / "instruments.csv")
+EXCHANGE_PREFIXES = ("MCX", "TQBR", "MOEX", "NASDAQ", "NYSE")
+# короче этого тикер без префикса биржи не ищем: «T», «NG», «X5» совпадают с обычными словами
+BARE_TICKER_MIN = 3
+# названия этих типов — нарицательные («евро», «золото»): только целым словом или явным алиасом
+WHOLE_WORD_TYPES = ("currency", "commodity")
+# падежные окончания имён собственных («Сбербанка», «Лукойлом», «Алросы»); произвольный хвост
+# из букв давал ложные совпадения («Магнитная» → Магнит)
+CASE_ENDINGS = ("а", "у", "ом", "е", "ы", "ов", "ам", "ами", "ах", "и", "ой", "ю")
+
+
+@dataclass(frozen=True)
+class Instrument:
+    ticker: str
+    type: str
+    exchange: str
+    name_ru: str
+    name_en: str
+
+
+def load_instruments(path: str = INSTRUMENTS_PATH) -> List[Tuple[Instrument, List[str]]]:
+    """Читает CSV ticker,type,exchange,name_ru,name_en,aliases (алиасы через «|»)."""
+    out: List[Tuple[Instrument, List[str]]] = []
+    with open(path, encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            ticker = (r.get("ticker") or "").strip()
+            if not ticker:
+                continue
+            inst = Instrument(ticker, (r.get("type") or "").strip(), (r.get("exchange") or "").strip(),
+                              (r.get("name_ru") or "").strip(), (r.get("name_en") or "").strip())
+            aliases = [a.strip() for a in (r.get("aliases") or "").split("|") if a.strip()]
+            out.append((inst, aliases))
+    return out
+
+
+def _inflects(inst: Instrument, name: str) -> bool:
+    # окончания допускаются только для имён собственных: с заглавной и не у валют/сырья
+    return inst.type not in WHOLE_WORD_TYPES and name[:1].isupper()
+
+
+def _variants(name: str) -> List[str]:
+    # регистрозависимо: «Магнит» — компания, «магнит» — нет; плюс КАПС и заглавная в начале фразы
+    return list(dict.fromkeys([name, name.upper(), name[:1].upper() + name[1:]]))
+
+
+class EntityExtractor:
+    """
+    Извлечение тикеров и компаний за один проход regex по тексту.
+
+    Тикеры, названия и алиасы (RU/EN) компилируются в префиксные деревья (trie_regex).
+    Имена собственные допускают падежное окончание из CASE_ENDINGS («Сбербанка», «Газпрому»),
+    нарицательные названия валют и сырья и тикеры ищутся только целым словом («Европы» — не евро);
+    жадность дерева отдаёт приоритет более длинному алиасу («Газпром нефть» раньше «Газпром»).
+    """
+
+    def __init__(self, rows: List[Tuple[Instrument, List[str]]]):
+        self.instruments: Dict[str, Instrument] = {}
+        self.surface: Dict[str, str] = {}
+        inflected: Dict[str, None] = {}
+        for inst, aliases in rows:
+            self.instruments[inst.ticker] = inst
+            for name in [inst.name_ru, inst.name_en, *aliases]:
+                if name:
+                    for v in _variants(name):
+                        if v not in self.surface and _inflects(inst, name):
+                            inflected[v] = None
+                        self.surface.setdefault(v, inst.ticker)
+            if len(inst.ticker) >= BARE_TICKER_MIN:
+                self.surface.setdefault(inst.ticker, inst.ticker)
+        exact = [v for v in self.surface if v not in inflected]
+        prefixed = "(?:" + "|".join(EXCHANGE_PREFIXES) + "):(?P<pref>" + trie_regex(self.instruments) + ")"
+        endings = trie_regex([*CASE_ENDINGS, *(e.upper() for e in CASE_ENDINGS)])
+        bare = r"(?<![\w/])(?:(?P<bare>" + trie_regex(inflected) + ")(?:" + endings + ")?|(?P<word>" + \
+            trie_regex(exact) + "))"
+        self.regex = re.compile("(?:" + prefixed + "|" + bare + r")(?![\w/])")
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        """{"tickers": [...], "names": [...]} в порядке первого упоминания."""
+        tickers: Dict[str, None] = {}
+        for m in self.regex.finditer(text or ""):
+            if m.group("pref"):
+                tickers.setdefault(m.group("pref"), None)
+            else:
+                tickers.setdefault(self.surface[m.group("bare") or m.group("word")], None)
+        return {"tickers": list(tickers),
+                "names": [self.instruments[t].name_ru for t in tickers]}
+
+
+@lru_cache(maxsize=1)
+def default_extractor(path: Optional[str] = None) -> EntityExtractor:
+    return EntityExtractor(load_instruments(path or INSTRUMENTS_PATH))
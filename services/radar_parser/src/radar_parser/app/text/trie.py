@@ -0,0 +1,31 @@
+from __future__ import annotations
+import re
+from typing import Dict, Iterable
+
+
+def trie_regex(terms: Iterable[str]) -> str:
+    """
+    Собирает из терминов regex-альтернативу в форме префиксного дерева:
+    ("угол", "уголь", "ук") → "у(?:гол(?:ь)?|к)". Движку не нужно перебирать термины по одному —
+    на каждой позиции он идёт по общему префиксу, а жадность даёт самый длинный термин.
+    """
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        if not term:
+            continue
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        end = "" in node
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if end:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
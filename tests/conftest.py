@@ -0,0 +1,21 @@
+"""
+Общая настройка тестов: пути пакетов как в запуске из корня репозитория и изолированный
+RADAR_CACHE_DIR — модули читают окружение при импорте, поэтому оно задаётся до них.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "services" / "radar_parser" / "src"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+os.environ["RADAR_CACHE_DIR"] = tempfile.mkdtemp(prefix="radar-tests-")
+os.environ["RADAR_EXPORT_DIR"] = ""
+os.environ["RADAR_RAW_ARCHIVE"] = ""
+os.environ.pop("OPENROUTER_API_KEY", None)
+os.environ.pop("RADAR_LLM_URL", None)
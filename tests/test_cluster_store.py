@@ -0,0 +1,44 @@
+import time
+
+from radar_parser.app.dedup.cluster_store import SqliteClusterIndex
+from services.radar_parser import llm_async_adapter
+from services.radar_parser.item_store import ItemStore
+
+TEXT = "Сбербанк повысил дивиденды: прибыль банка выросла, акции подорожали на Московской бирже"
+RETOLD = "Прибыль банка выросла, Сбербанк повысил дивиденды, акции подорожали на Московской бирже"
+
+
+def test_assign_groups_retellings_and_evict_by_arrival(tmp_path):
+    index = SqliteClusterIndex(tmp_path / "clusters.sqlite")
+    now = time.time()
+    a = index.assign("a", TEXT, None, "РБК", "https://a", now - 100 * 3600)
+    b = index.assign("b", RETOLD, None, "ТАСС", "https://b", now)
+    assert a.cluster_id == b.cluster_id
+    assert index.get(b.cluster_id).size == 2
+
+    assert index.evict(now, retain_hours=48) == 1
+    assert index.cluster_of("a") is None
+    assert index.get(b.cluster_id).size == 1
+    index.close()
+
+
+def test_warm_records_reassigns_items_evicted_from_index(tmp_path, monkeypatch):
+    store = ItemStore(tmp_path / "items.sqlite")
+    index = SqliteClusterIndex(tmp_path / "clusters.sqlite")
+    monkeypatch.setattr(llm_async_adapter, "_CLUSTER_INDEX", index)
+    now = time.time()
+    rec = {"ссылка на саму статью": "https://www.rbc.ru/a", "текст статьи": TEXT, "источник": "РБК",
+           "Время выхода": None}
+    # в лентах запись видели недавно (ItemStore держит её), а появилась она давно (индекс её вытеснил)
+    store.add("https://www.rbc.ru/a", rec, now - 100 * 3600)
+    store.is_seen("https://www.rbc.ru/a", now)
+    store.save()
+    index.assign("https://www.rbc.ru/a", TEXT, None, "РБК", "https://www.rbc.ru/a", now - 100 * 3600)
+    index.evict(now)
+    assert len(index) == 0
+
+    out = llm_async_adapter.warm_records(store)
+    assert len(out) == 1
+    assert out[0]["dedup_group"] == index.cluster_of("https://www.rbc.ru/a").cluster_id
+    index.close()
+    store.close()
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from radar_parser.app.export.columnar import ColumnarSink, read_dataset  # noqa: E402
+
+DAY = datetime(2025, 10, 20, 10, 0, tzinfo=timezone.utc)
+
+
+def _score(published, scored_at, source="РБК", rank=None):
+    return {"published": published, "scored_at": scored_at, "source": source, "url": f"https://x/{source}",
+            "dedup_group": "cl:1", "tickers": ["SBER"], "rank": rank, "hotness": 0.5, "financial": 0.7,
+            "recency": 0.9, "velocity": 0.1, "confirmations": 0.2, "source_rep": 0.8, "entities": 0.3,
+            "repeats": 2}
+
+
+def test_round_trip_with_date_partitions(tmp_path):
+    sink = ColumnarSink(str(tmp_path), "scores", time_column="published", fallback_column="scored_at")
+    sink.append([_score(DAY, DAY), _score(DAY - timedelta(days=1), DAY, source="ТАСС", rank=1),
+                 _score(None, DAY + timedelta(days=1), source="Ведомости")])
+    sink.close()
+
+    assert sorted(p.name for p in (tmp_path / "scores").iterdir()) == \
+        ["date=2025-10-19", "date=2025-10-20", "date=2025-10-21"]
+    table = read_dataset(str(tmp_path), "scores")
+    assert table.num_rows == 3
+    assert sorted(table.column("source").to_pylist()) == ["Ведомости", "РБК", "ТАСС"]
+    assert read_dataset(str(tmp_path), "scores", DAY, DAY + timedelta(hours=1)).column("source").to_pylist() \
+        == ["РБК"]
+    assert read_dataset(str(tmp_path), "scores", sources=["ТАСС"]).column("rank").to_pylist() == [1]
+
+
+def test_filter_on_non_partition_column_keeps_other_dates(tmp_path):
+    # опубликовано вчера, оценено сегодня: партиция — дата публикации, фильтр — по scored_at
+    sink = ColumnarSink(str(tmp_path), "scores")
+    sink.append([_score(DAY - timedelta(days=1), DAY)])
+    sink.close()
+    table = read_dataset(str(tmp_path), "scores", DAY - timedelta(hours=1), DAY + timedelta(hours=1),
+                         time_column="scored_at")
+    assert table.num_rows == 1
@@ -0,0 +1,24 @@
+import pytest
+
+from radar_parser.app.text.entities import default_extractor
+
+
+@pytest.mark.parametrize("text, tickers", [
+    ("Акции Сбербанка и Газпрому", ["SBER", "GAZP"]),
+    ("Выручка Лукойлом не раскрывается, СБЕРБАНКА тоже", ["LKOH", "SBER"]),
+    ("Доля Сургутнефтегаза выросла", ["SNGS"]),
+    ("MOEX:SBER растет, курс евро падает", ["SBER", "EUR/RUB"]),
+    ("Евро подешевел, золото подорожало", ["EUR/RUB", "GOLD"]),
+])
+def test_extracts_inflected_names_and_whole_words(text, tickers):
+    assert default_extractor().extract(text)["tickers"] == tickers
+
+
+@pytest.mark.parametrize("text", [
+    "Лидеры Европы обсудили пошлины",
+    "Золотое кольцо",
+    "Сургут готовится к зиме",
+    "Магнитная буря ударила по сетям",
+])
+def test_common_words_are_not_instruments(text):
+    assert default_extractor().extract(text) == {"tickers": [], "names": []}
@@ -0,0 +1,46 @@
+import asyncio
+
+from services.api.src.api.llm_cache import LLMCache
+
+
+def test_waiter_timeout_does_not_cancel_shared_compute(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "v"
+
+    async def main():
+        # первый ждущий запускает вычисление и отваливается по таймауту, второй присоединяется к нему
+        first = asyncio.ensure_future(asyncio.wait_for(cache.get_or_compute("k", compute), 0.05))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        return results
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, asyncio.TimeoutError)
+    assert second == "v"
+    assert calls == [1]
+    assert cache.get("k") == "v"
+    cache.close()
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite")
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def main():
+        try:
+            await cache.get_or_compute("k", fail)
+        except RuntimeError:
+            pass
+        return await cache.get_or_compute("k", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(main()) == "ok"
+    assert cache.get("k") == "ok"
+    cache.close()
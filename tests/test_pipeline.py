@@ -0,0 +1,130 @@
+"""Смоук пайплайна по фикстурам бенчмарка: ленты и статьи отдаёт локальный двойник источников."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from benchmarks.corpus import FEEDS
+from benchmarks.stand_in import StandIn
+from radar_parser.app.fetch.http_client import HttpError, close_session
+from radar_parser.app.fetch.validator_cache import ValidatorCache
+from services.radar_parser import pipeline
+
+
+@pytest.fixture(autouse=True)
+def validators(tmp_path, monkeypatch):
+    cache = ValidatorCache(str(tmp_path))
+    monkeypatch.setattr(pipeline, "VALIDATORS", cache)
+    return cache
+
+
+@asynccontextmanager
+async def serve(stand_in: StandIn):
+    app = stand_in.app()
+
+    async def slow(request):
+        await asyncio.sleep(5)
+        return web.Response(text="late")
+
+    app.router.add_get("/slow", slow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await close_session()
+        await runner.cleanup()
+
+
+def _sources(tmp_path, rows):
+    path = tmp_path / "sources.csv"
+    lines = ["name,type,url,verify_ssl,limit,fallback_url,tags,rate_limit"]
+    lines += [f"{name},{kind},{url},,,nan,media," for name, kind, url in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _feed_rows(base):
+    return [(FEEDS[name][1], "rss", f"{base}/feed/{name}/0") for name in FEEDS]
+
+
+def test_collects_all_feeds_and_reuses_items_on_304(tmp_path):
+    stand_in = StandIn(per_feed=20, pages=1)
+
+    async def main():
+        async with serve(stand_in) as base:
+            cfg = _sources(tmp_path, _feed_rows(base))
+            first = await pipeline.run_pipeline_async(cfg, hours=48, deadline=0)
+            second = await pipeline.run_pipeline_async(cfg, hours=48, deadline=0)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert not first["errors"]
+    assert first["total_items_raw"] == 20 * len(FEEDS)
+    assert set(first["by_source"]) == {FEEDS[name][1] for name in FEEDS}
+    # на повторном цикле все ленты ответили 304 и пришли из кэша валидаторов
+    assert stand_in.stats["not_modified"] == len(FEEDS)
+    assert [it["link"] for it in second["items"]] == [it["link"] for it in first["items"]]
+
+
+def test_page_cache_keeps_no_raw_html(tmp_path, validators):
+    stand_in = StandIn(per_feed=1, pages=1)
+
+    async def main():
+        async with serve(stand_in) as base:
+            url = f"{base}/article/tass/7"
+            cfg = _sources(tmp_path, [("ТАСС", "html", url)])
+            first = await pipeline.run_pipeline_async(cfg, hours=10 ** 6, deadline=0)
+            second = await pipeline.run_pipeline_async(cfg, hours=10 ** 6, deadline=0)
+        return url, first, second
+
+    url, first, second = asyncio.run(main())
+    assert [it["title"] for it in first["items"]] == ["Новость 7"]
+    assert "raw_html" not in validators.get(url)["items"][0]
+    assert stand_in.stats["not_modified"] == 1
+    assert second["items"] == first["items"]
+
+
+def test_cycle_deadline_marks_late_sources(tmp_path):
+    stand_in = StandIn(per_feed=5, pages=1)
+
+    async def main():
+        async with serve(stand_in) as base:
+            cfg = _sources(tmp_path, [("РБК", "rss", f"{base}/feed/rbc/0"), ("Медленный", "html", f"{base}/slow")])
+            t0 = time.monotonic()
+            res = await pipeline.run_pipeline_async(cfg, hours=48, deadline=1.0)
+            return res, time.monotonic() - t0
+
+    res, elapsed = asyncio.run(main())
+    assert elapsed < 3
+    assert res["per_source"]["Медленный"].get("timed_out")
+    assert res["per_source"]["РБК"]["ok"] == 5
+
+
+def test_hedged_fallback_wins_when_primary_is_slow():
+    async def fetch_one(url):
+        if url == "primary":
+            await asyncio.sleep(2)
+        return [url]
+
+    t0 = time.monotonic()
+    assert asyncio.run(pipeline._race_fallback(fetch_one, "primary", "fallback", 0.05)) == ["fallback"]
+    assert time.monotonic() - t0 < 1
+
+
+def test_fallback_only_on_listed_statuses_without_hedge():
+    def fetcher(status):
+        async def fetch_one(url):
+            if url == "primary":
+                raise HttpError(url, status)
+            return [url]
+        return fetch_one
+
+    assert asyncio.run(pipeline._race_fallback(fetcher(404), "primary", "fallback", 0)) == ["fallback"]
+    with pytest.raises(HttpError):
+        asyncio.run(pipeline._race_fallback(fetcher(500), "primary", "fallback", 0))
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from services.api.src.api.service import _score_static
+from services.api.src.api.window import EventWindow
+
+NOW = datetime(2025, 10, 20, 10, 0, tzinfo=timezone.utc)
+
+
+def _linkless(text):
+    return {"Время выхода": NOW.isoformat(), "источник": "Телеграм", "текст статьи": text, "dedup_group": "cl:1",
+            "entities": {"tickers": ["SBER"], "names": ["Сбербанк"]}}
+
+
+def test_linkless_members_of_one_cluster_are_all_kept():
+    window = EventWindow()
+    for text in ("Сбербанк повысил дивиденды, акции и прибыль банка выросли на бирже",
+                 "Акции Сбербанка выросли на бирже после роста дивидендов и прибыли банка"):
+        ev = _score_static(_linkless(text), NOW)
+        assert ev is not None and ev.key.startswith("fp:")
+        window.add(ev)
+    assert len(window) == 2
+    assert len(window.members("cl:1", NOW)) == 2